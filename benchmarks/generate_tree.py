@@ -0,0 +1,230 @@
+"""Generate a synthetic backup drive for the benchmarks.
+
+The tree is deterministic for a given scale and seed: nested folders, small documents,
+JPEGs with and without Exif DateTimeOriginal, MP4 files with a real movie header, planted
+duplicates, empty files and folders, unwanted files and the system folders Windows leaves
+on removable drives. A manifest with the counts and sizes is written next to the tree.
+
+    python benchmarks/generate_tree.py /tmp/bench-tree --scale small
+"""
+import argparse
+import io
+import json
+import os
+import random
+import struct
+import sys
+import time
+from datetime import datetime, timedelta
+from PIL import Image
+
+# Named sizes of generated trees: number of files, folder depth and sub-folders per folder
+SCALES = {
+    "tiny": {"files": 200, "depth": 3, "fanout": 3},
+    "small": {"files": 2_000, "depth": 4, "fanout": 4},
+    "medium": {"files": 20_000, "depth": 5, "fanout": 5},
+    "large": {"files": 200_000, "depth": 6, "fanout": 6},
+    "huge": {"files": 2_000_000, "depth": 7, "fanout": 7},
+}
+
+# Share of each kind of file; duplicates copy an earlier image or video byte for byte
+FILE_KINDS = {
+    "jpeg_exif": 0.30,
+    "jpeg_plain": 0.10,
+    "mp4": 0.05,
+    "document": 0.35,
+    "duplicate": 0.10,
+    "empty": 0.04,
+    "unwanted": 0.06,
+}
+SYSTEM_FOLDERS = ["$RECYCLE.BIN", "System Volume Information"]
+UNWANTED_NAMES = ["Thumbs.db", ".DS_Store", "desktop.ini", "backup.bak", "setup.tmp", "clip.thm"]
+DOCUMENT_EXTENSIONS = [".txt", ".pdf", ".docx", ".csv", ".json"]
+EMPTY_FOLDER_SHARE = 0.05
+OLDEST_DATE = datetime(2005, 1, 1)
+DATE_RANGE_DAYS = 365 * 19
+MP4_EPOCH_OFFSET = 2082844800
+
+def exif_segment(date):
+    """A JPEG APP1 segment holding a big-endian TIFF header with only Exif DateTimeOriginal."""
+    date_bytes = date.strftime("%Y:%m:%d %H:%M:%S").encode() + b"\x00"
+    tiff = b"MM\x00\x2a" + struct.pack(">I", 8)
+    # IFD0: one entry pointing to the Exif IFD at offset 26
+    tiff += struct.pack(">H", 1) + struct.pack(">HHII", 0x8769, 4, 1, 26) + struct.pack(">I", 0)
+    # Exif IFD: DateTimeOriginal as 20 ASCII bytes stored at offset 44
+    tiff += struct.pack(">H", 1) + struct.pack(">HHII", 0x9003, 2, len(date_bytes), 44) + struct.pack(">I", 0)
+    payload = b"Exif\x00\x00" + tiff + date_bytes
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+def comment_segment(text):
+    """A JPEG COM segment; it makes every generated image unique without re-encoding it."""
+    data = text.encode()
+    return b"\xff\xfe" + struct.pack(">H", len(data) + 2) + data
+
+def make_jpeg_templates(rng, count=8):
+    """Encode a few small JPEGs once; generated images reuse them with a unique comment."""
+    templates = []
+    for _ in range(count):
+        img = Image.new("RGB", (64, 48), tuple(rng.randrange(256) for _ in range(3)))
+        for _ in range(6):
+            x, y = rng.randrange(64), rng.randrange(48)
+            img.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, min(x + 16, 64), min(y + 12, 48)))
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=85)
+        templates.append(buffer.getvalue())
+    return templates
+
+def make_jpeg(template, unique_id, date=None):
+    segments = comment_segment(f"purespace-bench {unique_id}")
+    if date is not None:
+        segments = exif_segment(date) + segments
+    return template[:2] + segments + template[2:]
+
+def atom(kind, payload):
+    return struct.pack(">I4s", len(payload) + 8, kind) + payload
+
+def make_mp4(rng, date, media_bytes):
+    """An ISO BMFF file with ftyp, a version 0 mvhd (creation time, or 0 for none) and an mdat of random bytes."""
+    creation = int((date - datetime(1970, 1, 1)).total_seconds()) + MP4_EPOCH_OFFSET if date else 0
+    mvhd = atom(b"mvhd", struct.pack(">BxxxIIII", 0, creation, creation, 1000, 1000) + bytes(80))
+    return (atom(b"ftyp", b"isom\x00\x00\x02\x00isomiso2mp41")
+            + atom(b"moov", mvhd)
+            + atom(b"mdat", rng.randbytes(media_bytes)))
+
+def build_folders(rng, root, depth, fanout):
+    """Random nested folder layout; returns the folders files are placed in."""
+    folders = [root]
+    frontier = [(root, 0)]
+    while frontier:
+        folder, level = frontier.pop()
+        if level >= depth:
+            continue
+        for i in range(rng.randint(1, fanout)):
+            child = os.path.join(folder, f"folder_{level}_{i}")
+            folders.append(child)
+            frontier.append((child, level + 1))
+    return folders
+
+def generate_tree(root, files=2_000, depth=4, fanout=4, seed=1, mean_kb=16):
+    """Create the synthetic tree under root (which must not exist) and return its manifest."""
+    if os.path.exists(root):
+        raise FileExistsError(f"{root} already exists")
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    templates = make_jpeg_templates(rng)
+    folders = build_folders(rng, root, depth, fanout)
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
+
+    counts = dict.fromkeys(FILE_KINDS, 0)
+    counts.update(empty_folders=0, system_files=0)
+    total_bytes = 0
+    media = []  # (path, mtime) of images and videos that duplicates copy
+    kinds, weights = list(FILE_KINDS), list(FILE_KINDS.values())
+
+    def write(path, data, mtime):
+        nonlocal total_bytes
+        with open(path, "wb") as f:
+            f.write(data)
+        os.utime(path, (mtime, mtime))
+        total_bytes += len(data)
+
+    for i in range(files):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "duplicate" and not media:
+            kind = "jpeg_exif"
+        folder = rng.choice(folders)
+        date = OLDEST_DATE + timedelta(days=rng.randrange(DATE_RANGE_DAYS), seconds=rng.randrange(86400))
+        mtime = (date - datetime(1970, 1, 1)).total_seconds()
+
+        if kind in ("jpeg_exif", "jpeg_plain"):
+            path = os.path.join(folder, f"IMG_{i:07d}.jpg")
+            write(path, make_jpeg(rng.choice(templates), i, date if kind == "jpeg_exif" else None), mtime)
+            media.append((path, mtime))
+        elif kind == "mp4":
+            path = os.path.join(folder, f"VID_{i:07d}.mp4")
+            has_date = rng.random() < 0.8
+            write(path, make_mp4(rng, date if has_date else None, int(rng.expovariate(1 / (mean_kb * 4096)))), mtime)
+            media.append((path, mtime))
+        elif kind == "duplicate":
+            original, original_mtime = rng.choice(media)
+            with open(original, "rb") as f:
+                data = f.read()
+            name = os.path.basename(original)
+            path = os.path.join(folder, f"{os.path.splitext(name)[0]}_copy_{i}{os.path.splitext(name)[1]}")
+            write(path, data, original_mtime)
+        elif kind == "empty":
+            write(os.path.join(folder, f"empty_{i:07d}.txt"), b"", mtime)
+        elif kind == "unwanted":
+            name = rng.choice(UNWANTED_NAMES)
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                path = os.path.join(folder, f"{i:07d}_{name.lstrip('.')}")
+            write(path, rng.randbytes(rng.randint(1, 512)), mtime)
+        else:
+            size = int(rng.expovariate(1 / (mean_kb * 1024)))
+            write(os.path.join(folder, f"doc_{i:07d}{rng.choice(DOCUMENT_EXTENSIONS)}"), rng.randbytes(size), mtime)
+        counts[kind] += 1
+
+    # Empty folders, some of them nested, and the system folders that must be skipped
+    for i in range(max(1, int(len(folders) * EMPTY_FOLDER_SHARE))):
+        empty = os.path.join(rng.choice(folders), f"empty_folder_{i}")
+        if rng.random() < 0.5:
+            empty = os.path.join(empty, "nested")
+        os.makedirs(empty, exist_ok=True)
+        counts["empty_folders"] += 1
+    for name in SYSTEM_FOLDERS:
+        system_dir = os.path.join(root, name, "S-1-5-21")
+        os.makedirs(system_dir, exist_ok=True)
+        for i in range(max(1, files // 1000)):
+            write(os.path.join(system_dir, f"$R{i:06d}.jpg"), make_jpeg(templates[0], f"system {i}"), time.time())
+            counts["system_files"] += 1
+
+    manifest = {
+        "root": os.path.abspath(root),
+        "seed": seed,
+        "files": files + counts["system_files"],
+        "bytes": total_bytes,
+        "folders": len(folders) + counts["empty_folders"],
+        "depth": depth,
+        "fanout": fanout,
+        "counts": counts,
+        "generated_seconds": round(time.perf_counter() - started, 2),
+    }
+    with open(manifest_path(root), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def manifest_path(root):
+    return os.path.abspath(root).rstrip(os.sep) + ".manifest.json"
+
+def load_manifest(root):
+    with open(manifest_path(root)) as f:
+        return json.load(f)
+
+def ensure_tree(root, scale, seed=1):
+    """Return the manifest of the tree at root, generating it first if it does not exist yet."""
+    if os.path.exists(manifest_path(root)) and os.path.isdir(root):
+        return load_manifest(root)
+    return generate_tree(root, seed=seed, **SCALES[scale])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic backup drive for benchmarking.")
+    parser.add_argument("root", help="Folder to create (must not exist).")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--files", type=int, help="Number of files (overrides the scale).")
+    parser.add_argument("--depth", type=int, help="Folder depth (overrides the scale).")
+    parser.add_argument("--fanout", type=int, help="Maximum sub-folders per folder (overrides the scale).")
+    parser.add_argument("--mean-kb", type=int, default=16, help="Mean size of documents in KB.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    params = dict(SCALES[args.scale])
+    params.update({key: value for key, value in
+                   {"files": args.files, "depth": args.depth, "fanout": args.fanout}.items() if value is not None})
+    try:
+        manifest = generate_tree(args.root, seed=args.seed, mean_kb=args.mean_kb, **params)
+    except FileExistsError as e:
+        sys.exit(str(e))
+    print(json.dumps(manifest, indent=2))
@@ -0,0 +1,261 @@
+"""Time core operations on synthetic trees and compare the results between runs.
+
+Every case runs in its own Python process on a fresh copy of the generated tree, with its own
+state folder (PURESPACE_STATE_DIR), so no scan index, journal or setting carries over between
+cases or from the app. Only the operation itself is timed; copying the tree and setup steps
+(e.g. organizing before looking for duplicates) are not.
+
+    python benchmarks/run_benchmarks.py run --scales tiny small --cases organize duplicates
+    python benchmarks/run_benchmarks.py compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+TREE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "purespace-bench")
+TEST_KEY = bytes(range(32))
+
+# Case name -> (setup steps, timed step), each a step of run_step run in the case's process
+CASES = {
+    "organize": ([], "organize"),
+    "duplicates": (["organize"], "duplicates"),
+    "empty-files": ([], "empty-files"),
+    "empty-folders": ([], "empty-folders"),
+    "unwanted": ([], "unwanted"),
+    "large-files": ([], "large-files"),
+    "cleanup": ([], "cleanup"),
+    "encrypt": ([], "encrypt"),
+    "decrypt": (["encrypt"], "decrypt"),
+}
+DEFAULT_CASES = ["organize", "duplicates", "cleanup", "encrypt", "decrypt"]
+PROC_IO_FIELDS = ("rchar", "wchar", "syscr", "syscw", "read_bytes", "write_bytes")
+
+
+def read_proc_io():
+    """I/O counters of this process from /proc/self/io (Linux only), or an empty dict."""
+    try:
+        with open("/proc/self/io") as f:
+            values = dict(line.split(": ") for line in f.read().splitlines())
+    except OSError:
+        return {}
+    return {field: int(values[field]) for field in PROC_IO_FIELDS if field in values}
+
+def children_peak_rss_mb():
+    """Peak resident memory of the largest finished child process (e.g. an encryption worker) in MB."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024), 1)
+
+def run_step(step, tree):
+    """Run one benchmark step on the copied tree; imports happen here, after PURESPACE_STATE_DIR is set."""
+    from core import (organize_media_by_date, move_media_duplicates, delete_empty_files, delete_empty_folders,
+                      move_unwanted_files, find_large_files, run_cleanup, encrypt_directory, decrypt_directory)
+    steps = {
+        "organize": lambda: organize_media_by_date(dry_run=False),
+        "duplicates": lambda: move_media_duplicates(dry_run=False),
+        "empty-files": lambda: delete_empty_files(dry_run=False),
+        "empty-folders": lambda: delete_empty_folders(dry_run=False),
+        "unwanted": lambda: move_unwanted_files(dry_run=False),
+        "large-files": lambda: find_large_files(),
+        "cleanup": lambda: run_cleanup(dry_run=False),
+        "encrypt": lambda: encrypt_directory(tree, key=TEST_KEY),
+        "decrypt": lambda: decrypt_directory(encrypted_path(tree), key=TEST_KEY),
+    }
+    return steps[step]()
+
+def encrypted_path(tree):
+    return os.path.join(os.path.dirname(tree), f"encrypted_{os.path.basename(tree)}")
+
+def run_case_in_process(case, tree_source, work_dir, settings):
+    """Body of a case process: copy the tree, run the setup steps, then measure the timed step."""
+    from core.helpers import get_peak_rss_mb
+    from services.services import config, logger
+
+    tree = os.path.join(work_dir, "tree")
+    shutil.copytree(tree_source, tree, symlinks=True)
+    config.override(source_dir=tree, **settings)
+
+    setup, timed = CASES[case]
+    for step in setup:
+        run_step(step, tree)
+
+    io_before = read_proc_io()
+    started = time.perf_counter()
+    cpu_before = time.process_time()
+    run_step(timed, tree)
+    seconds = time.perf_counter() - started
+    cpu_seconds = time.process_time() - cpu_before
+    io_after = read_proc_io()
+
+    return {
+        "seconds": seconds,
+        "cpu_seconds": cpu_seconds,
+        "io": {field: io_after[field] - io_before[field] for field in io_after},
+        "peak_rss_mb": get_peak_rss_mb(),
+        "workers_peak_rss_mb": children_peak_rss_mb(),
+        "events": logger.last_summary(),
+    }
+
+def run_case(case, scale, tree, manifest, settings):
+    """Run a case in a fresh interpreter and return its measurements."""
+    with tempfile.TemporaryDirectory(prefix=f"purespace-{case}-") as work_dir:
+        env = dict(os.environ, PURESPACE_STATE_DIR=os.path.join(work_dir, "state"))
+        command = [sys.executable, os.path.abspath(__file__), "_case", case, tree, work_dir, json.dumps(settings)]
+        result = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"{case} on {scale} failed:\n{result.stderr[-2000:]}")
+        measured = json.loads(result.stdout.strip().splitlines()[-1])
+
+    seconds = max(measured["seconds"], 1e-9)
+    measured.update(
+        case=case,
+        scale=scale,
+        files=manifest["files"],
+        bytes=manifest["bytes"],
+        files_per_s=round(manifest["files"] / seconds, 1),
+        mb_per_s=round(manifest["bytes"] / (1024 * 1024) / seconds, 2),
+    )
+    return measured
+
+def summarize_repeats(runs):
+    """Median time and rates over repeated runs; peak memory is the highest seen."""
+    by_time = sorted(runs, key=lambda run: run["seconds"])
+    summary = dict(by_time[len(by_time) // 2])
+    summary["seconds"] = round(statistics.median(run["seconds"] for run in runs), 4)
+    summary["cpu_seconds"] = round(statistics.median(run["cpu_seconds"] for run in runs), 4)
+    summary["files_per_s"] = round(summary["files"] / max(summary["seconds"], 1e-9), 1)
+    summary["mb_per_s"] = round(summary["bytes"] / (1024 * 1024) / max(summary["seconds"], 1e-9), 2)
+    summary["peak_rss_mb"] = max((run["peak_rss_mb"] or 0) for run in runs)
+    summary["all_seconds"] = [round(run["seconds"], 4) for run in runs]
+    return summary
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+def run_benchmarks(args):
+    from generate_tree import ensure_tree
+
+    settings = dict(args.settings)
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "settings": settings,
+        "notes": "syscr/syscw count the benchmark process only, not encryption worker processes",
+        "results": [],
+    }
+    for scale in args.scales:
+        tree = os.path.join(args.tree_dir, f"{scale}-seed{args.seed}")
+        os.makedirs(args.tree_dir, exist_ok=True)
+        manifest = ensure_tree(tree, scale, seed=args.seed)
+        print(f"{scale}: {manifest['files']} files, {manifest['bytes'] / (1024 * 1024):.1f} MB", file=sys.stderr)
+        for case in args.cases:
+            runs = [run_case(case, scale, tree, manifest, settings) for _ in range(args.repeat)]
+            summary = summarize_repeats(runs)
+            results["results"].append(summary)
+            print(f"  {case:<14} {summary['seconds']:>9.3f}s {summary['files_per_s']:>11.1f} files/s "
+                  f"{summary['mb_per_s']:>8.2f} MB/s  syscr={summary['io'].get('syscr', '-')} "
+                  f"syscw={summary['io'].get('syscw', '-')}  peak RSS {summary['peak_rss_mb']} MB", file=sys.stderr)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+    return 0
+
+def compare_results(args):
+    """Print old vs new per (scale, case); returns 1 if any case got slower by more than the threshold."""
+    with open(args.old) as f:
+        old = {(r["scale"], r["case"]): r for r in json.load(f)["results"]}
+    with open(args.new) as f:
+        new = {(r["scale"], r["case"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"{'scale':<8} {'case':<14} {'old s':>9} {'new s':>9} {'change':>8} {'syscalls':>10} {'peak RSS':>10}")
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = (after["seconds"] - before["seconds"]) / max(before["seconds"], 1e-9) * 100
+        syscalls_before = before["io"].get("syscr", 0) + before["io"].get("syscw", 0)
+        syscalls_after = after["io"].get("syscr", 0) + after["io"].get("syscw", 0)
+        syscall_change = f"{(syscalls_after - syscalls_before) / syscalls_before * 100:+.0f}%" if syscalls_before else "-"
+        rss_change = f"{(after['peak_rss_mb'] or 0) - (before['peak_rss_mb'] or 0):+.1f} MB"
+        flag = ""
+        if change > args.threshold:
+            regressions += 1
+            flag = "  SLOWER"
+        print(f"{key[0]:<8} {key[1]:<14} {before['seconds']:>9.3f} {after['seconds']:>9.3f} {change:>+7.1f}% "
+              f"{syscall_change:>10} {rss_change:>10}{flag}")
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0]:<8} {key[1]:<14} only in {'old' if key in old else 'new'} results")
+    return 1 if regressions else 0
+
+def parse_setting(text):
+    key, _, value = text.partition("=")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PureSpace operations on synthetic trees.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run benchmark cases and write a results file.")
+    run.add_argument("--scales", nargs="+", default=["small"], help="Tree scales (see generate_tree.SCALES).")
+    run.add_argument("--cases", nargs="+", default=DEFAULT_CASES, choices=list(CASES), metavar="CASE",
+                     help=f"Cases to run: {', '.join(CASES)}.")
+    run.add_argument("--repeat", type=int, default=3, help="Runs per case; the median time is reported.")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--set", dest="settings", action="append", default=[], type=parse_setting, metavar="KEY=VALUE",
+                     help="Setting for every case, e.g. --set use_scan_index=false.")
+    run.add_argument("--tree-dir", default=TREE_CACHE_DIR, help="Where generated trees are cached.")
+    run.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>.json).")
+
+    compare = commands.add_parser("compare", help="Compare two results files.")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown reported as a regression.")
+
+    # Internal: body of one case process
+    case = commands.add_parser("_case")
+    case.add_argument("case")
+    case.add_argument("tree")
+    case.add_argument("work_dir")
+    case.add_argument("settings")
+
+    args = parser.parse_args(argv)
+    if args.command == "_case":
+        sys.path.insert(0, REPO_DIR)
+        measured = run_case_in_process(args.case, args.tree, args.work_dir, json.loads(args.settings))
+        print(json.dumps(measured, default=str))
+        return 0
+    if args.command == "compare":
+        return compare_results(args)
+    return run_benchmarks(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
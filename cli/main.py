@@ -0,0 +1,186 @@
+import argparse
+import functools
+import getpass
+import json
+import os
+import signal
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from core import *
+from core.progress import progress, TaskProgress, OperationCancelled
+from core.metrics import metrics
+from services.services import *
+
+# Exit codes
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_NO_DIRECTORY = 3
+EXIT_CANCELLED = 130
+
+def parse_setting(text):
+    """Parse a --set key=value option; the value is read as JSON when possible (numbers, lists, true/false)."""
+    key, sep, value = text.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"expected key=value, got {text!r}")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+def read_key(args):
+    """Read the AES key (and optional legacy IV) from the arguments, the environment, or a prompt."""
+    key_hex = args.key or os.environ.get("PURESPACE_KEY") or getpass.getpass("AES-256 key (64 hex characters): ")
+    key = bytes.fromhex(key_hex.strip())
+    iv = bytes.fromhex(args.iv) if args.iv else None
+    if len(key) != 32 or (iv is not None and len(iv) != 16):
+        raise ValueError("Key must be 64 hex chars, IV must be 32 hex chars.")
+    return key, iv
+
+def run_encryption(args, operation):
+    key, iv = read_key(args)
+    return operation(config.get("source_dir"), key=key, iv=iv, dry_run=args.dry_run, workers=args.workers)
+
+# Subcommand -> function(args) returning the operation's result
+COMMANDS = {
+    "organize": lambda args: organize_media_by_date(dry_run=args.dry_run, merge_media=not args.separate),
+    "duplicates": lambda args: move_media_duplicates(dry_run=args.dry_run, scope=args.scope),
+    "near-duplicates": lambda args: move_near_duplicates(dry_run=args.dry_run, scope=args.scope, threshold=args.threshold),
+    "link-duplicates": lambda args: link_media_duplicates(dry_run=args.dry_run, mode=args.mode, scope=args.scope),
+    "delete-duplicates": lambda args: delete_duplicates_folders(dry_run=args.dry_run, scope=args.scope),
+    "empty-files": lambda args: delete_empty_files(dry_run=args.dry_run),
+    "empty-folders": lambda args: delete_empty_folders(dry_run=args.dry_run),
+    "large-files": lambda args: find_large_files(),
+    "unwanted": lambda args: move_unwanted_files(dry_run=args.dry_run),
+    "undo": lambda args: undo_moves(dry_run=args.dry_run, operation=args.operation, journal_path=args.journal),
+    "apply": lambda args: apply_plan(dry_run=args.dry_run, plan_path=args.plan, reasons=args.reasons),
+    "encrypt": lambda args: run_encryption(args, encrypt_directory),
+    "decrypt": lambda args: run_encryption(args, decrypt_directory),
+    "run": lambda args: run_pipeline(dry_run=args.dry_run, steps=args.steps, merge_media=not args.separate),
+    "watch": lambda args: watch_source(dry_run=args.dry_run, merge_media=not args.separate, dedupe=not args.no_dedupe,
+                                       initial_scan=not args.no_initial_scan),
+}
+
+def add_common_options(parser, default=None):
+    """Options accepted both before and after the command name."""
+    parser.add_argument("--source", default=default, help="Folder to work on (default: source_dir from the settings).")
+    parser.add_argument("--dry-run", action="store_true", default=default or False,
+                        help="Only report (and plan) what would change.")
+    parser.add_argument("--set", dest="settings", action="append", default=default or [], type=parse_setting,
+                        metavar="KEY=VALUE", help="Override a setting for this run only, e.g. --set size_threshold_mb=500.")
+    parser.add_argument("--json", action="store_true", default=default or False, help="Print a JSON summary of the run to stdout.")
+    parser.add_argument("--progress", action="store_true", default=default or False, help="Print progress to stderr.")
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="purespace",
+        description="Organize, clean and deduplicate a folder without the GUI.",
+    )
+    add_common_options(parser)
+    common = argparse.ArgumentParser(add_help=False)
+    add_common_options(common, default=argparse.SUPPRESS)
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+    commands.add_parser = functools.partial(commands.add_parser, parents=[common])
+
+    organize = commands.add_parser("organize", help="Sort images and videos into year/month folders.")
+    organize.add_argument("--separate", action="store_true", help="Keep images and videos in separate folders.")
+    for name, text in [("duplicates", "Move exact duplicates to Duplicates folders."),
+                       ("near-duplicates", "Move visually similar photos to Near_Duplicates folders."),
+                       ("link-duplicates", "Replace exact duplicates with hardlinks or reflinks.")]:
+        command = commands.add_parser(name, help=text)
+        command.add_argument("--scope", choices=["month", "library", "source"], help="Where duplicates are searched.")
+        if name == "near-duplicates":
+            command.add_argument("--threshold", type=int, help="Maximum Hamming distance between similar photos.")
+        if name == "link-duplicates":
+            command.add_argument("--mode", choices=["hardlink", "reflink", "auto"], help="How duplicates are linked.")
+    delete_duplicates = commands.add_parser("delete-duplicates", help="Delete the Duplicates folders.")
+    delete_duplicates.add_argument("--scope", choices=["month", "library", "source"], help="Scope the duplicates were moved with.")
+    commands.add_parser("empty-files", help="Delete empty files.")
+    commands.add_parser("empty-folders", help="Delete empty folders.")
+    commands.add_parser("large-files", help="List files above size_threshold_mb.")
+    commands.add_parser("unwanted", help="Move unwanted files to Unwanted_Files.")
+
+    undo = commands.add_parser("undo", help="Revert the last journaled run.")
+    undo.add_argument("--operation", help="Only consider journals of this operation.")
+    undo.add_argument("--journal", help="Path of the journal to revert.")
+    apply = commands.add_parser("apply", help="Execute the plan written by the last dry run.")
+    apply.add_argument("--plan", help="Path of the plan to execute (default: the latest).")
+    apply.add_argument("--reasons", nargs="+", help="Only apply moves with these reasons (e.g. dated unsorted).")
+
+    for name in ("encrypt", "decrypt"):
+        command = commands.add_parser(name, help=f"{name.capitalize()} the folder into a sibling folder.")
+        command.add_argument("--key", help="AES-256 key in hex (default: $PURESPACE_KEY or a prompt).")
+        command.add_argument("--iv", help="IV in hex, only for the legacy chained format.")
+        command.add_argument("--workers", type=int, help="Number of worker processes.")
+
+    run = commands.add_parser("run", help="Run several steps over a single listing of the folder.")
+    run.add_argument("steps", nargs="+", choices=list(PIPELINE_STEPS), metavar="STEP",
+                     help=f"Steps in order: {', '.join(PIPELINE_STEPS)}.")
+    run.add_argument("--separate", action="store_true", help="Keep images and videos in separate folders.")
+
+    watch = commands.add_parser("watch", help="Keep organizing new files as they arrive, until interrupted.")
+    watch.add_argument("--separate", action="store_true", help="Keep images and videos in separate folders.")
+    watch.add_argument("--no-dedupe", action="store_true", help="Do not look for duplicates of the new files.")
+    watch.add_argument("--no-initial-scan", action="store_true", help="Ignore files already waiting in the folder.")
+    return parser
+
+def print_progress(snapshot):
+    done = snapshot["files_done"]
+    total = f"/{snapshot['files_total']}" if snapshot["files_total"] else ""
+    eta = f", ETA {snapshot['eta_seconds']}s" if snapshot["eta_seconds"] is not None else ""
+    print(f"\r{snapshot['task']}: {snapshot['phase']} {done}{total} ({snapshot['files_per_s']} files/s{eta})\033[K",
+          end="", file=sys.stderr, flush=True)
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        config.override(**dict(args.settings))
+        if args.source:
+            config.override(source_dir=os.path.abspath(args.source))
+    except KeyError as e:
+        parser.error(str(e.args[0]))
+
+    # Ctrl+C (or SIGTERM, e.g. from a service manager stopping `watch`) cancels the operation
+    # at its next file boundary, so journals and plans stay consistent
+    task = TaskProgress(args.command, report=print_progress if args.progress else None)
+    signal.signal(signal.SIGINT, lambda signum, frame: task.cancel())
+    signal.signal(signal.SIGTERM, lambda signum, frame: task.cancel())
+    progress.bind(task)
+
+    started = time.perf_counter()
+    summary = {"command": args.command, "source_dir": config.get("source_dir"), "dry_run": args.dry_run}
+    try:
+        result = COMMANDS[args.command](args)
+        summary.update(status="ok", result=result)
+        exit_code = EXIT_OK
+        if args.command == "run" and any(step["status"] != "ok" for step in result or []):
+            summary["status"] = "error"
+            exit_code = EXIT_ERROR
+    except OperationCancelled:
+        summary.update(status="cancelled")
+        exit_code = EXIT_CANCELLED
+    except DirectoryNotFoundError as e:
+        summary.update(status="error", error=str(e))
+        exit_code = EXIT_NO_DIRECTORY
+    except Exception as e:
+        summary.update(status="error", error=str(e))
+        exit_code = EXIT_ERROR
+    finally:
+        progress.unbind()
+        if args.progress:
+            print(file=sys.stderr)
+
+    summary["events"] = logger.last_summary()
+    summary["metrics"] = metrics.last_report()
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    if args.json:
+        print(json.dumps(summary, indent=2, default=str))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
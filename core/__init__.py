@@ -1,8 +1,12 @@
 # Import key functions from each module
 from .helpers import ensure_directory_exists, is_folder_empty, DirectoryNotFoundError, FileMoveError
-from .media_organizer import organize_media_by_date, move_media_duplicates, delete_duplicates_folders, check_ffmpeg_installed
-from .cleaner import delete_empty_files, delete_empty_folders, find_large_files, move_unwanted_files
-from .encryptor import decrypt_directory, encrypt_directory
+from .media_organizer import organize_media_by_date, move_media_duplicates, link_media_duplicates, move_near_duplicates, delete_duplicates_folders, check_ffmpeg_installed
+from .cleaner import delete_empty_files, delete_empty_folders, find_large_files, move_unwanted_files, run_cleanup
+from .journal import undo_moves
+from .plan import apply_plan
+from .pipeline import run_pipeline, PIPELINE_STEPS
+from .watcher import watch_source
+from .encryptor import decrypt_directory, encrypt_directory, decrypt_single_file, encrypt_single_file
 # List of public functions accessible with `from core import *`
 __all__ = [
     "ensure_directory_exists",
@@ -12,11 +16,21 @@ __all__ = [
     "organize_media_by_date",
     "check_ffmpeg_installed",
     "move_media_duplicates",
+    "link_media_duplicates",
+    "move_near_duplicates",
     "delete_duplicates_folders",
     "delete_empty_files",
     "delete_empty_folders",
     "find_large_files",
     "move_unwanted_files",
+    "run_cleanup",
+    "undo_moves",
+    "apply_plan",
+    "run_pipeline",
+    "PIPELINE_STEPS",
+    "watch_source",
     "encrypt_directory",
-    "decrypt_directory"
+    "decrypt_directory",
+    "encrypt_single_file",
+    "decrypt_single_file"
 ]
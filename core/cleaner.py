@@ -1,79 +1,156 @@
 import os
-from core.helpers import ensure_directory_exists, is_folder_empty, bytes_to_mb, is_excluded_path, safe_move_file, validate_source_dir, FileMoveError
+from itertools import groupby
+from core.helpers import ensure_directory_exists, bytes_to_mb
 from services.services import *
-from core.wrappers import operation_wrapper,with_dry_run,walk_directory
+from core.wrappers import operation_wrapper,with_dry_run
+from core.inventory import build_inventory, scan_tree
+from core.space_report import SpaceReport
+from core.journal import run_journaled_moves
+from core.plan import write_plan
+from core.progress import progress
 
 @operation_wrapper
 @with_dry_run(default=False)
-def delete_empty_files(source_dir, dry_run):
-    """Delete empty files while skipping excluded directories. Set dry_run=True to simulate the process."""
-    excluded_folders = config.get("excluded_folders")
-
-    for root, _, files in walk_directory(source_dir, excluded_folders):
-        for file in files:
-            file_path = os.path.join(root, file)
-            if os.path.getsize(file_path) == 0:
-                if dry_run:
-                    logger.info(f"[DRY RUN] Would delete empty file: {file_path}")
-                else:
-                    os.remove(file_path)
-                    logger.info(f"Deleted empty file: {file_path}")
+def delete_empty_files(source_dir, dry_run, inventory=None):
+    """Delete empty files while skipping excluded directories. Set dry_run=True to simulate the process.
+
+    A file that cannot be deleted (locked, no permission) is logged and skipped; returns how many were skipped.
+    """
+    if inventory is None:
+        inventory = build_inventory(source_dir, config.get("excluded_folders"))
+
+    failed = 0
+    progress.phase("Deleting empty files", total_files=len(inventory.files))
+    for entry in inventory.iter_files():
+        progress.advance()
+        if entry.category.empty:
+            if dry_run:
+                logger.event("would_delete_file", f"[DRY RUN] Would delete empty file: {entry.path}", path=entry.path)
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                logger.warning(f"Warning: Could not delete {entry.path}: {e}")
+                failed += 1
+                continue
+            inventory.remove_file(entry.path)
+            logger.event("deleted_file", f"Deleted empty file: {entry.path}", path=entry.path)
+
+    if failed:
+        logger.warning(f"Warning: {failed} empty files could not be deleted.")
+    return failed
 
 @operation_wrapper
 @with_dry_run(default=False)
-def delete_empty_folders(source_dir, dry_run):
-    """Delete empty folders while skipping excluded directories. Set dry_run=True to simulate the process."""
-    excluded_folders = config.get("excluded_folders")
-
-    for root, dirs, _ in walk_directory(source_dir, excluded_folders, topdown=False):
-        for folder in dirs:
-            folder_path = os.path.join(root, folder)
-            if is_excluded_path(folder_path, excluded_folders):
+def delete_empty_folders(source_dir, dry_run, inventory=None):
+    """Delete empty folders while skipping excluded directories. Set dry_run=True to simulate the process.
+
+    A folder that cannot be deleted is logged and kept, and so are its parents; returns how many were skipped.
+    """
+    if inventory is None:
+        inventory = build_inventory(source_dir, config.get("excluded_folders"))
+
+    failed = 0
+    # Children come before their parents, so folders emptied by a deletion are caught too
+    for folder_path in inventory.iter_dirs_bottom_up():
+        if inventory.is_dir_empty(folder_path):
+            if dry_run:
+                logger.event("would_delete_folder", f"[DRY RUN] Would delete empty folder: {folder_path}", path=folder_path)
+                continue
+            try:
+                os.rmdir(folder_path)
+            except OSError as e:
+                logger.warning(f"Warning: Could not delete {folder_path}: {e}")
+                failed += 1
                 continue
+            inventory.remove_dir(folder_path)
+            logger.event("deleted_folder", f"Deleted empty folder: {folder_path}", path=folder_path)
 
-            if is_folder_empty(folder_path):
-                if dry_run:
-                    logger.info(f"[DRY RUN] Would delete empty folder: {folder_path}")
-                else:
-                    os.rmdir(folder_path)
-                    logger.info(f"Deleted empty folder: {folder_path}")
+    if failed:
+        logger.warning(f"Warning: {failed} empty folders could not be deleted.")
+    return failed
 
 @operation_wrapper
-def find_large_files(source_dir):
-    """Find files larger than the defined size threshold."""
-    excluded_folders = config.get("excluded_folders")
-    size_threshold_mb = config.get("size_threshold_mb")
-
-    for root, _, files in walk_directory(source_dir, excluded_folders):
-        for file in files:
-            file_path = os.path.join(root, file)
-            size_mb = bytes_to_mb(os.path.getsize(file_path))
-            if size_mb > size_threshold_mb:
-                logger.info(f"Large file found: {file_path} ({size_mb:.2f} MB)")
+def find_large_files(source_dir, inventory=None):
+    """Report where the space goes, in one streaming pass over the tree.
+
+    Returns a dict (see SpaceReport.result) with the largest files over size_threshold_mb
+    (at most large_files_top), the biggest folders down to space_report_depth levels, a size
+    histogram and usage by extension and by class. Only a summary is logged.
+    """
+    report = SpaceReport(source_dir, top=int(config.get("large_files_top") or 0),
+                         depth=int(config.get("space_report_depth") or 0))
+
+    if inventory is not None:
+        progress.phase("Checking sizes", total_files=len(inventory.files))
+        directories = groupby(inventory.iter_files(), key=lambda entry: os.path.dirname(entry.path))
+    else:
+        progress.phase("Checking sizes")
+        directories = ((directory, files) for directory, _, files in scan_tree(source_dir, config.get("excluded_folders")))
+    for directory, files in directories:
+        files = list(files)
+        report.add_directory(directory, files)
+        progress.advance(files=len(files))
+
+    result = report.result()
+    over = result["over_threshold"]
+    logger.info(f"Scanned {result['total_files']} files ({bytes_to_mb(result['total_bytes']):.2f} MB); "
+                f"{over['files']} are over {config.get('size_threshold_mb')} MB ({bytes_to_mb(over['bytes']):.2f} MB).")
+    for item in result["largest_files"]:
+        logger.info(f"Large file found: {item['path']} ({bytes_to_mb(item['size']):.2f} MB)")
+    for item in result["directories"][:5]:
+        logger.info(f"Folder: {item['path']} ({bytes_to_mb(item['size']):.2f} MB in {item['files']} files)")
+    return result
 
 @operation_wrapper
 @with_dry_run(default=False)
-def move_unwanted_files(source_dir, dry_run):
-    """Move unwanted files by extension or name to the Unwanted_Files folder."""
-    unwanted_extensions = config.get("unwanted_extensions")
-    unwanted_files = config.get("unwanted_files")
-    excluded_folders = config.get("excluded_folders")
+def move_unwanted_files(source_dir, dry_run, inventory=None):
+    """Move unwanted files (by extension, name or pattern, see RuleSet) to the Unwanted_Files folder (journaled, see undo_moves).
+
+    A dry run writes the planned moves to a plan file and returns its path (see apply_plan).
+    """
     unwanted_folder = os.path.join(source_dir, "Unwanted_Files")
+    if inventory is None:
+        inventory = build_inventory(source_dir, config.get("excluded_folders"))
 
     ensure_directory_exists(unwanted_folder)
 
-    # Walk through the source directory, skipping excluded folders
-    for root, _, files in walk_directory(source_dir, excluded_folders):
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_ext = os.path.splitext(file)[1].lower()
-
-            # Check if the file matches unwanted criteria
-            if file_ext in unwanted_extensions or file.lower() in unwanted_files:
-                destination_path = os.path.join(unwanted_folder, file)
-
-                if dry_run:
-                    logger.info(f"[DRY RUN] Would move: {file_path} -> {destination_path}")
-                else:
-                    safe_move_file(file_path, destination_path)
-                    logger.info(f"Moved: {file_path} -> {destination_path}")
\ No newline at end of file
+    def plan_moves():
+        for entry in inventory.iter_files():
+            if entry.category.kind == "unwanted":
+                yield {"src": entry.path, "dest": os.path.join(unwanted_folder, entry.name), "reason": "unwanted",
+                       "size": entry.size, "mtime_ns": entry.mtime_ns}
+
+    if dry_run:
+        return write_plan("move_unwanted_files", source_dir, plan_moves())
+
+    run_journaled_moves("move_unwanted_files", source_dir, plan_moves,
+                        on_moved=lambda src, dest: inventory.remove_file(src))
+
+# Cleanup operations in the order run_cleanup applies them
+CLEANUP_OPERATIONS = {
+    "move_unwanted_files": move_unwanted_files,
+    "delete_empty_files": delete_empty_files,
+    "delete_empty_folders": delete_empty_folders,
+    "find_large_files": find_large_files,
+}
+
+@operation_wrapper
+@with_dry_run(default=False)
+def run_cleanup(source_dir, dry_run, operations=None):
+    """Run several cleanup operations against a single inventory of the source directory."""
+    operations = operations or list(CLEANUP_OPERATIONS)
+    unknown = [name for name in operations if name not in CLEANUP_OPERATIONS]
+    if unknown:
+        raise ValueError(f"Unknown cleanup operations: {unknown}")
+
+    inventory = build_inventory(source_dir, config.get("excluded_folders"))
+    logger.info(f"Inventory: {len(inventory.files)} files in {len(inventory.dir_entries)} folders.")
+
+    for name, operation in CLEANUP_OPERATIONS.items():
+        if name not in operations:
+            continue
+        if name == "find_large_files":
+            operation(inventory=inventory)
+        else:
+            operation(dry_run=dry_run, inventory=inventory)
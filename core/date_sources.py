@@ -0,0 +1,135 @@
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from core.metadata import read_exif_date_original, UnsupportedImageError
+from services.services import config
+
+# Sources get_media_date can consult, in the order of the date_sources setting:
+#   metadata - Exif DateTimeOriginal / container creation time (opens the file, cached in the scan index)
+#   sidecar  - an XMP (photo.jpg.xmp, photo.xmp) or THM (Canon video thumbnail) file next to the media
+#   filename - a date in the file name (IMG_20190412_153012.jpg, VID-20170101-WA0003.mp4, PXL_...)
+#   mtime    - the file's modification time
+DATE_SOURCES = ("metadata", "sidecar", "filename", "mtime")
+
+# Built-in file name patterns: camera apps, WhatsApp, Pixel, screenshots and Dropbox camera uploads.
+# Each has the named groups year, month, day and optionally hour, minute, second.
+FILENAME_DATE_PATTERNS = [
+    r"(?:IMG|VID|PXL|MVIMG|PANO|BURST\d*|Screenshot|Screen_Recording)?[_-]?(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})[_-](?P<hour>\d{2})(?P<minute>\d{2})(?P<second>\d{2})",
+    r"(?:IMG|VID|AUD|PTT)-(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})-WA\d+",
+    r"(?:Screenshot|Screen Shot)[ _-](?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})(?:[ _-]+(?:at[ _])?(?P<hour>\d{2})[.:-](?P<minute>\d{2})[.:-](?P<second>\d{2}))?",
+    r"(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})[ _](?P<hour>\d{2})\.(?P<minute>\d{2})\.(?P<second>\d{2})",
+]
+
+SIDECAR_EXTENSIONS = (".xmp", ".thm")
+XMP_READ_BYTES = 256 * 1024
+
+# XMP date properties, most trusted first; stored either as attributes or as elements
+XMP_DATE_PROPERTIES = ["exif:DateTimeOriginal", "photoshop:DateCreated", "xmp:CreateDate"]
+XMP_DATE_PATTERNS = [
+    re.compile(rf'{re.escape(name)}\s*=\s*"([^"]+)"|<{re.escape(name)}>([^<]+)</{re.escape(name)}>'.encode())
+    for name in XMP_DATE_PROPERTIES
+]
+XMP_DATE_VALUE = re.compile(r"(\d{4})[-:](\d{2})[-:](\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2}))?)?")
+
+
+class FilenameDateMatcher:
+    """File name date patterns, compiled once; the first pattern that yields a plausible date wins."""
+
+    def __init__(self, patterns):
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+
+    def match(self, name):
+        stem = os.path.splitext(name)[0]
+        for pattern in self.patterns:
+            found = pattern.search(stem)
+            if found:
+                fields = found.groupdict()
+                file_date = make_date(fields["year"], fields["month"], fields["day"],
+                                      fields.get("hour"), fields.get("minute"), fields.get("second"))
+                if file_date:
+                    return file_date
+        return None
+
+
+@lru_cache(maxsize=4)
+def _compile(extra_patterns):
+    return FilenameDateMatcher(list(extra_patterns) + FILENAME_DATE_PATTERNS)
+
+def get_filename_matcher():
+    """Return the matcher for the built-in patterns plus date_filename_patterns, compiled once."""
+    patterns = config.get("date_filename_patterns") or ()
+    if isinstance(patterns, str):
+        patterns = [patterns]  # A single pattern saved as text, not one pattern per character
+    return _compile(tuple(patterns))
+
+def get_date_sources():
+    """The date_sources setting, checked against DATE_SOURCES."""
+    sources = list(config.get("date_sources") or DATE_SOURCES)
+    unknown = [source for source in sources if source not in DATE_SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown date sources: {unknown}")
+    return sources
+
+def make_date(year, month, day, hour=None, minute=None, second=None):
+    """Build a datetime from matched digits, or None if they are not a plausible capture date."""
+    try:
+        file_date = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    except ValueError:
+        return None
+    if file_date.year < 1990 or file_date > datetime.now():
+        return None
+    return file_date
+
+def date_from_filename(name):
+    """Capture date encoded in a file name, or None."""
+    return get_filename_matcher().match(name)
+
+@lru_cache(maxsize=256)
+def _sidecars_in(directory, mtime_ns):
+    # One listing per folder (and per change of the folder): lowercase name -> name on disk
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name.lower(): entry.name for entry in entries
+                    if os.path.splitext(entry.name)[1].lower() in SIDECAR_EXTENSIONS}
+    except OSError:
+        return {}
+
+def find_sidecars(file_path):
+    """Paths of the XMP and THM sidecars of a media file (photo.jpg.xmp, photo.xmp, photo.thm)."""
+    directory, name = os.path.split(file_path)
+    try:
+        sidecars = _sidecars_in(directory, os.stat(directory).st_mtime_ns)
+    except OSError:
+        return []
+    if not sidecars:
+        return []
+    stem = os.path.splitext(name)[0].lower()
+    candidates = [f"{name.lower()}.xmp", f"{stem}.xmp", f"{stem}.thm"]
+    return [os.path.join(directory, sidecars[candidate]) for candidate in candidates if candidate in sidecars]
+
+def read_xmp_date(xmp_path):
+    """Capture date of an XMP sidecar, from the most trusted date property it has."""
+    with open(xmp_path, "rb") as f:
+        data = f.read(XMP_READ_BYTES)
+    for pattern in XMP_DATE_PATTERNS:
+        found = pattern.search(data)
+        if found:
+            value = XMP_DATE_VALUE.match((found.group(1) or found.group(2)).decode("ascii", "replace").strip())
+            if value:
+                return make_date(*value.groups())
+    return None
+
+def date_from_sidecar(file_path):
+    """Capture date from the first sidecar of file_path that has one, or None."""
+    for sidecar in find_sidecars(file_path):
+        try:
+            if sidecar.lower().endswith(".xmp"):
+                file_date = read_xmp_date(sidecar)
+            else:
+                file_date = read_exif_date_original(sidecar)
+        except (OSError, UnsupportedImageError):
+            continue
+        if file_date:
+            return file_date
+    return None
@@ -0,0 +1,180 @@
+import os
+from collections import defaultdict
+from core.helpers import bytes_to_mb
+from core.hash_engine import get_hash_engine
+from core.exclusions import compile_exclusions
+from core.hashing import hash_files
+from core.scan_index import scan_index, lookup_file_hash
+from core.progress import progress
+from core.metrics import metrics
+from services.services import logger
+
+SAMPLE_SIZE = 64 * 1024  # Bytes read from each of the head, middle and tail of a file
+REVIEW_FOLDERS = {"Duplicates", "Near_Duplicates"}  # Where flagged files go; never scanned again
+
+def sample_length(size, sample_size=SAMPLE_SIZE):
+    """Number of bytes get_sample_hash reads for a file of the given size."""
+    return min(size, 3 * sample_size)
+
+def get_sample_hash(file_path, size, sample_size=SAMPLE_SIZE, engine=None):
+    """Hash the head, middle and tail of a file. Files small enough are hashed whole,
+    in which case the result equals the engine's full digest of the file."""
+    engine = engine or get_hash_engine()
+    if size <= 3 * sample_size:
+        return engine.hash_file(file_path)
+    return engine.hash_ranges(file_path, [(offset, sample_size) for offset in (0, (size - sample_size) // 2, size - sample_size)])
+
+def _skip_unreadable(path, error):
+    """Log and skip files that could not be read; unexpected errors are re-raised."""
+    if error is None:
+        return False
+    if not isinstance(error, OSError):
+        raise error
+    logger.warning(f"Warning: Could not read {path}: {error}")
+    return True
+
+def new_duplicate_stats():
+    """Counters describing how much reading each detection stage avoided."""
+    return {
+        "files": 0,
+        "total_bytes": 0,
+        "size_stage_skipped_bytes": 0,
+        "sample_stage_read_bytes": 0,
+        "sample_stage_skipped_bytes": 0,
+        "full_hash_read_bytes": 0,
+    }
+
+def find_duplicate_groups(files, stats=None, hashes=None):
+    """Group byte-identical files from a list of (path, size) pairs.
+
+    Files are bucketed by exact size, then by a head/middle/tail sample hash, and only
+    files that still collide are hashed in full, concurrently through hash_files. Each
+    returned group keeps the input order, so group[0] is the file that would have been
+    seen first. If a hashes dict is given, it receives the full content hash (binary digest,
+    see HashEngine) of every grouped file (empty files excepted).
+    """
+    engine = get_hash_engine()
+    if stats is None:
+        stats = new_duplicate_stats()
+    if hashes is None:
+        hashes = {}
+
+    order = {}
+    by_size = defaultdict(list)
+    for index, (path, size) in enumerate(files):
+        order[path] = index
+        by_size[size].append(path)
+        stats["files"] += 1
+        stats["total_bytes"] += size
+
+    # Stage 1: a file with a unique size cannot have a duplicate
+    candidates = []
+    for size, paths in by_size.items():
+        if len(paths) < 2:
+            stats["size_stage_skipped_bytes"] += size * len(paths)
+        else:
+            candidates.append((size, paths))
+
+    groups = []
+    sizes = {}
+    for size, paths in candidates:
+        if size == 0:
+            groups.append(paths)
+            continue
+        for path in paths:
+            sizes[path] = size
+
+    # Stage 2: cheap sample hash on files that share a size
+    by_sample = defaultdict(list)
+    sample_items = [(path, sample_length(size)) for path, size in sizes.items()]
+    progress.phase("Comparing samples", total_files=len(sample_items), total_bytes=sum(n for _, n in sample_items))
+    for path, sample_hash, error in hash_files(sample_items, lambda p: get_sample_hash(p, sizes[p], engine=engine)):
+        if _skip_unreadable(path, error):
+            continue
+        by_sample[(sizes[path], sample_hash)].append(path)
+        stats["sample_stage_read_bytes"] += sample_length(sizes[path])
+
+    full_hash_items = []
+    for (size, sample_hash), sample_paths in by_sample.items():
+        if len(sample_paths) < 2:
+            stats["sample_stage_skipped_bytes"] += size - sample_length(size)
+        elif size <= 3 * SAMPLE_SIZE:
+            # The sample already covered the whole file
+            groups.append(sample_paths)
+            hashes.update((path, sample_hash) for path in sample_paths)
+        else:
+            full_hash_items.extend((path, size) for path in sample_paths)
+
+    # Stage 3: full hash only for files that still collide, reusing indexed hashes
+    by_hash = defaultdict(list)
+    uncached_items = []
+    stat_results = {}
+    for path, size in full_hash_items:
+        file_hash, stat_results[path] = lookup_file_hash(path, engine.name)
+        if file_hash:
+            by_hash[file_hash].append(path)
+        else:
+            uncached_items.append((path, size))
+
+    progress.phase("Hashing", total_files=len(uncached_items), total_bytes=sum(n for _, n in uncached_items))
+    for path, file_hash, error in hash_files(uncached_items, engine.hash_file):
+        if _skip_unreadable(path, error):
+            continue
+        by_hash[file_hash].append(path)
+        stats["full_hash_read_bytes"] += sizes[path]
+        if stat_results[path] is not None:
+            scan_index.store(path, stat_results[path], file_hash=file_hash, hash_algorithm=engine.name)
+    for file_hash, group in by_hash.items():
+        if len(group) > 1:
+            groups.append(group)
+            hashes.update((path, file_hash) for path in group)
+
+    for group in groups:
+        group.sort(key=order.__getitem__)
+    groups.sort(key=lambda group: order[group[0]])
+    return groups
+
+def log_duplicate_stats(stats):
+    """Log how many bytes each detection stage avoided reading."""
+    logger.info(
+        f"Duplicate scan: {stats['files']} files ({bytes_to_mb(stats['total_bytes']):.2f} MB). "
+        f"Size stage skipped {bytes_to_mb(stats['size_stage_skipped_bytes']):.2f} MB, "
+        f"sample stage read {bytes_to_mb(stats['sample_stage_read_bytes']):.2f} MB and skipped "
+        f"{bytes_to_mb(stats['sample_stage_skipped_bytes']):.2f} MB, "
+        f"full hashing read {bytes_to_mb(stats['full_hash_read_bytes']):.2f} MB."
+    )
+
+def list_media_files(folder, media_extensions):
+    """Return (path, size) pairs for the media files directly inside folder, in listing order."""
+    media_files = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if os.path.splitext(entry.name)[1].lower() not in media_extensions:
+                continue
+            media_files.append((entry.path, entry.stat().st_size))
+    metrics.count("stats", len(media_files))
+    return media_files
+
+def walk_media_files(root_dir, media_extensions, excluded_folders):
+    """Return (path, size) pairs for every media file under root_dir, skipping Duplicates/Near_Duplicates folders."""
+    matcher = compile_exclusions(excluded_folders)
+    media_files = []
+    for root, dirs, files in os.walk(root_dir):
+        dirs[:] = [d for d in dirs if d not in REVIEW_FOLDERS and not matcher.matches_dir(os.path.join(root, d), d)]
+        for file in files:
+            if os.path.splitext(file)[1].lower() not in media_extensions:
+                continue
+            file_path = os.path.join(root, file)
+            try:
+                media_files.append((file_path, os.path.getsize(file_path)))
+            except OSError:
+                logger.warning(f"Warning: Could not read size of {file_path}")
+    return media_files
+
+def keeper_sort_key(file_path, root_dir):
+    """Deterministic keeper preference: dated folders before Unsorted, then the earliest relative path."""
+    relative_path = os.path.relpath(file_path, root_dir)
+    parts = relative_path.split(os.sep)
+    return ("Unsorted" in parts, os.path.normcase(relative_path))
@@ -1,80 +1,282 @@
 import os
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from queue import Queue, Empty, Full
 from pathlib import Path
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
 
-from core.helpers import ensure_directory_exists, safe_move_file, safe_create_directory, get_nonconflicting_path
-from services.services import logger
-from core.wrappers import with_dry_run
+from core.helpers import ensure_directory_exists, safe_create_directory, bytes_to_mb, get_peak_rss_mb
+from core.mover import NameReservations
+from core.progress import progress, OperationCancelled
+from services.services import logger, config
 
 BLOCK_SIZE = AES.block_size  # 16 bytes
 
-def encrypt_file(input_path, output_path, cipher, dry_run=False):
-    if dry_run:
-        logger.info(f"[DRY RUN] Would encrypt: {input_path} → {output_path}")
-        return
+# Per-file format: MAGIC + random IV, then the AES-256-CBC ciphertext of that file alone
+FILE_MAGIC = b"PSE1"
+HEADER_SIZE = len(FILE_MAGIC) + BLOCK_SIZE
 
-    with open(input_path, 'rb') as f_in:
-        data = f_in.read()
-    padded_data = pad(data, BLOCK_SIZE)
-    encrypted_data = cipher.encrypt(padded_data)
+class EncryptedFormatError(Exception):
+    """Raised when a file does not carry the per-file encryption header."""
+    pass
+
+def get_buffer_size():
+    """Streaming buffer size from config, rounded down to a whole number of AES blocks."""
+    buffer_bytes = int(float(config.get("crypto_buffer_mb") or 4) * 1024 * 1024)
+    return max(BLOCK_SIZE, buffer_bytes - buffer_bytes % BLOCK_SIZE)
+
+def read_chunks(f, chunk_size):
+    """Yield (chunk, is_last) pairs from f. A background thread reads ahead so disk reads overlap with cipher work."""
+    chunks = Queue(maxsize=2)
+    stop = threading.Event()
 
+    def reader():
+        try:
+            while not stop.is_set():
+                chunk = f.read(chunk_size)
+                item = chunk if chunk else None
+                while not stop.is_set():
+                    try:
+                        chunks.put(item, timeout=0.1)
+                        break
+                    except Full:
+                        continue
+                if item is None:
+                    return
+        except Exception as e:
+            chunks.put(e)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        previous = None
+        while True:
+            item = chunks.get()
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                break
+            if previous is not None:
+                yield previous, False
+            previous = item
+        yield (previous if previous is not None else b""), True
+    finally:
+        stop.set()
+        # Unblock the reader if it is waiting on a full queue
+        try:
+            while True:
+                chunks.get_nowait()
+        except Empty:
+            pass
+        thread.join()
+
+@contextmanager
+def open_output(output_path):
+    """Open output_path for writing; if anything fails before it is complete, the partial file is removed."""
     ensure_directory_exists(os.path.dirname(output_path))
-    with open(output_path, 'wb') as f_out:
-        f_out.write(encrypted_data)
+    try:
+        with open(output_path, 'wb') as f_out:
+            yield f_out
+    except BaseException:
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+        raise
 
-    logger.info(f"Encrypted: {input_path} → {output_path}")
+def encrypt_file(input_path, output_path, cipher, dry_run=False):
+    """Encrypt a file with a fixed-size buffer, so memory use does not depend on the file size. Returns bytes read."""
+    if dry_run:
+        logger.event("would_encrypt", f"[DRY RUN] Would encrypt: {input_path} → {output_path}", src=input_path, dest=output_path)
+        return 0
+
+    bytes_read = 0
+    with open(input_path, 'rb') as f_in, open_output(output_path) as f_out:
+        for chunk, is_last in read_chunks(f_in, get_buffer_size()):
+            bytes_read += len(chunk)
+            # Full chunks are whole AES blocks; only the final chunk is padded
+            f_out.write(cipher.encrypt(pad(chunk, BLOCK_SIZE) if is_last else chunk))
+
+    logger.event("encrypted", f"Encrypted: {input_path} → {output_path}", src=input_path, dest=output_path)
+    return bytes_read
 
 def decrypt_file(input_path, output_path, cipher, dry_run=False):
+    """Decrypt a file with a fixed-size buffer, so memory use does not depend on the file size. Returns bytes read."""
     if dry_run:
-        logger.info(f"[DRY RUN] Would decrypt: {input_path} → {output_path}")
-        return
+        logger.event("would_decrypt", f"[DRY RUN] Would decrypt: {input_path} → {output_path}", src=input_path, dest=output_path)
+        return 0
 
-    with open(input_path, 'rb') as f_in:
-        encrypted_data = f_in.read()
-    decrypted_padded_data = cipher.decrypt(encrypted_data)
-    data = unpad(decrypted_padded_data, BLOCK_SIZE)
+    bytes_read = 0
+    with open(input_path, 'rb') as f_in, open_output(output_path) as f_out:
+        for chunk, is_last in read_chunks(f_in, get_buffer_size()):
+            bytes_read += len(chunk)
+            data = cipher.decrypt(chunk)
+            f_out.write(unpad(data, BLOCK_SIZE) if is_last else data)
 
-    ensure_directory_exists(os.path.dirname(output_path))
-    with open(output_path, 'wb') as f_out:
-        f_out.write(data)
+    logger.event("decrypted", f"Decrypted: {input_path} → {output_path}", src=input_path, dest=output_path)
+    return bytes_read
 
-    logger.info(f"Decrypted: {input_path} → {output_path}")
+def encrypt_single_file(input_path, output_path, key):
+    """Encrypt one file on its own: a fresh random IV is stored in the file header. Returns bytes read."""
+    iv = os.urandom(BLOCK_SIZE)
+    cipher = AES.new(key, AES.MODE_CBC, iv)
 
+    bytes_read = 0
+    with open(input_path, 'rb') as f_in, open_output(output_path) as f_out:
+        f_out.write(FILE_MAGIC + iv)
+        for chunk, is_last in read_chunks(f_in, get_buffer_size()):
+            bytes_read += len(chunk)
+            f_out.write(cipher.encrypt(pad(chunk, BLOCK_SIZE) if is_last else chunk))
+    return bytes_read
 
-def encrypt_directory(source_dir, key, iv, dry_run=False):
-    parent_dir = Path(source_dir).parent
-    encrypted_dir = safe_create_directory(parent_dir, f'encrypted_{Path(source_dir).name}')
+def decrypt_single_file(input_path, output_path, key):
+    """Decrypt one file written by encrypt_single_file, independently of any other file. Returns bytes read."""
+    with open(input_path, 'rb') as f_in:
+        header = f_in.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE or not header.startswith(FILE_MAGIC):
+            raise EncryptedFormatError(f"Missing per-file encryption header: {input_path}")
+        cipher = AES.new(key, AES.MODE_CBC, header[len(FILE_MAGIC):])
 
-    cipher = AES.new(key, AES.MODE_CBC, iv)
+        bytes_read = HEADER_SIZE
+        with open_output(output_path) as f_out:
+            for chunk, is_last in read_chunks(f_in, get_buffer_size()):
+                bytes_read += len(chunk)
+                data = cipher.decrypt(chunk)
+                f_out.write(unpad(data, BLOCK_SIZE) if is_last else data)
+    return bytes_read
+
+def get_crypto_workers():
+    """Number of worker processes for directory encryption; 0 in config means one per CPU."""
+    return int(config.get("crypto_workers") or 0) or os.cpu_count() or 1
 
-    for root, _, files in os.walk(source_dir):
-        for file in files:
+def plan_directory_outputs(source_dir, output_dir):
+    """Yield (input_path, output_path) for every file under source_dir, mirrored into output_dir."""
+    names = NameReservations()
+    for root, _, files_in_dir in os.walk(source_dir):
+        for file in files_in_dir:
             full_input_path = Path(root) / file
             relative_path = full_input_path.relative_to(source_dir)
-            full_output_path = encrypted_dir / relative_path
+            yield str(full_input_path), names.reserve(str(output_dir / relative_path))
+
+def run_file_pool(task, jobs, key, action, workers=None):
+    """Run task(input, output, key) for every job on a process pool; returns (files, bytes, failures)."""
+    workers = workers or get_crypto_workers()
+    files = total_bytes = failures = 0
+    progress.phase(action)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+
+        def collect(return_when):
+            nonlocal files, total_bytes, failures
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                input_path, output_path = pending.pop(future)
+                try:
+                    nbytes = future.result()
+                    total_bytes += nbytes
+                    files += 1
+                    progress.advance(nbytes=nbytes)
+                    logger.event(action.lower(), f"{action}: {input_path} → {output_path}", src=input_path, dest=output_path, bytes=nbytes)
+                except (OSError, ValueError, EncryptedFormatError) as e:
+                    failures += 1
+                    logger.error(f"Could not process {input_path}: {e}")
 
-            output_path = get_nonconflicting_path(full_output_path)
-            encrypt_file(str(full_input_path), str(output_path), cipher, dry_run=dry_run)
+        # Keep a bounded number of files queued so huge trees do not build millions of futures
+        try:
+            for input_path, output_path in jobs:
+                if len(pending) >= workers * 4:
+                    collect(FIRST_COMPLETED)
+                pending[executor.submit(task, input_path, output_path, key)] = (input_path, output_path)
+            while pending:
+                collect(FIRST_COMPLETED)
+        except OperationCancelled:
+            # Only the files already being processed are finished
+            for future in pending:
+                future.cancel()
+            raise
 
+    return files, total_bytes, failures
 
+def log_throughput(action, files, total_bytes, started):
+    """Log and return files, bytes, MB/s and peak RSS for a directory operation."""
+    elapsed = time.perf_counter() - started
+    stats = {
+        "files": files,
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 3),
+        "mb_per_s": round(bytes_to_mb(total_bytes) / elapsed, 2) if elapsed > 0 else 0.0,
+        "peak_rss_mb": get_peak_rss_mb(),
+    }
+    logger.info(
+        f"{action} {files} files ({bytes_to_mb(total_bytes):.2f} MB) in {stats['seconds']:.2f}s "
+        f"at {stats['mb_per_s']:.2f} MB/s, peak RSS {stats['peak_rss_mb']} MB"
+    )
+    return stats
 
-def decrypt_directory(source_dir, key, iv, dry_run=False):
+
+def encrypt_directory(source_dir, key, iv=None, dry_run=False, workers=None):
+    """Encrypt every file under source_dir into a sibling encrypted_<name> folder.
+
+    Without an IV each file gets its own random IV in a small header and files are encrypted
+    independently on a process pool. Passing an IV keeps the legacy format, where a single
+    CBC cipher is chained across all files in walk order.
+    """
     parent_dir = Path(source_dir).parent
-    decrypted_dir = safe_create_directory(parent_dir, f'decrypted_{Path(source_dir).name}')
+    encrypted_dir = safe_create_directory(parent_dir, f'encrypted_{Path(source_dir).name}')
+    started = time.perf_counter()
+    files = total_bytes = failures = 0
 
-    cipher = AES.new(key, AES.MODE_CBC, iv)
+    if dry_run or iv is not None:
+        cipher = AES.new(key, AES.MODE_CBC, iv) if iv is not None else None
+        progress.phase("Encrypted")
+        for input_path, output_path in plan_directory_outputs(source_dir, encrypted_dir):
+            nbytes = encrypt_file(input_path, output_path, cipher, dry_run=dry_run)
+            total_bytes += nbytes
+            files += 1
+            progress.advance(nbytes=nbytes)
+    else:
+        files, total_bytes, failures = run_file_pool(
+            encrypt_single_file, plan_directory_outputs(source_dir, encrypted_dir), key, "Encrypted", workers
+        )
 
-    for root, _, files in os.walk(source_dir):
-        for file in files:
-            full_input_path = Path(root) / file
-            relative_path = full_input_path.relative_to(source_dir)
-            full_output_path = decrypted_dir / relative_path
+    stats = log_throughput("Encrypted", files, total_bytes, started)
+    stats["failures"] = failures
+    return stats
+
+def decrypt_directory(source_dir, key, iv=None, dry_run=False, workers=None):
+    """Decrypt every file under source_dir into a sibling decrypted_<name> folder.
+
+    Without an IV files are expected in the per-file format and are decrypted in parallel.
+    Passing an IV decrypts the legacy chained format, which must be replayed in walk order.
+    """
+    parent_dir = Path(source_dir).parent
+    decrypted_dir = safe_create_directory(parent_dir, f'decrypted_{Path(source_dir).name}')
+    started = time.perf_counter()
+    files = total_bytes = failures = 0
+
+    if dry_run or iv is not None:
+        cipher = AES.new(key, AES.MODE_CBC, iv) if iv is not None else None
+        progress.phase("Decrypted")
+        for input_path, output_path in plan_directory_outputs(source_dir, decrypted_dir):
+            nbytes = decrypt_file(input_path, output_path, cipher, dry_run=dry_run)
+            total_bytes += nbytes
+            files += 1
+            progress.advance(nbytes=nbytes)
+    else:
+        files, total_bytes, failures = run_file_pool(
+            decrypt_single_file, plan_directory_outputs(source_dir, decrypted_dir), key, "Decrypted", workers
+        )
 
-            output_path = get_nonconflicting_path(full_output_path)
-            decrypt_file(str(full_input_path), str(output_path), cipher, dry_run=dry_run)
+    stats = log_throughput("Decrypted", files, total_bytes, started)
+    stats["failures"] = failures
+    return stats
 
 # Note: Key must be a 64-character hexadecimal string (32 bytes) and IV a 32-character hex string (16 bytes).
+# The IV is only needed for the legacy chained format; the per-file format stores its own IVs.
 # Example usage:
 # key = bytes.fromhex(user_key_hex)
 # iv = bytes.fromhex(user_iv_hex)
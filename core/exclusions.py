@@ -0,0 +1,61 @@
+import os
+import re
+import fnmatch
+from functools import lru_cache
+
+GLOB_CHARACTERS = "*?["
+
+class ExclusionMatcher:
+    """Excluded folders compiled into hashed sets and a single regex.
+
+    Each entry of excluded_folders is one of:
+      - a folder name ("$RECYCLE.BIN"), matched against any folder's own name,
+      - a glob pattern ("*.photoslibrary", "Backup_*"), matched against the folder's name,
+      - a path ("D:/Old/Windows"), which excludes that folder and everything below it.
+    """
+
+    def __init__(self, excluded_folders):
+        self.names = set()
+        self.paths = set()
+        patterns = []
+        for folder in excluded_folders or []:
+            if os.path.isabs(folder) or "/" in folder or os.sep in folder:
+                self.paths.add(os.path.normcase(os.path.abspath(folder)))
+            elif any(char in folder for char in GLOB_CHARACTERS):
+                patterns.append(fnmatch.translate(os.path.normcase(folder)))
+            else:
+                self.names.add(os.path.normcase(folder))
+        self.pattern = re.compile("|".join(patterns)) if patterns else None
+
+    def matches_dir(self, path, name=None):
+        """Check a folder by its own name and path only; its parents are assumed to be checked already."""
+        name = os.path.normcase(name if name is not None else os.path.basename(os.path.normpath(path)))
+        if name in self.names:
+            return True
+        if self.pattern is not None and self.pattern.match(name):
+            return True
+        return bool(self.paths) and os.path.normcase(os.path.abspath(path)) in self.paths
+
+    def is_excluded(self, path):
+        """Check a folder by name, and against excluded paths for the folder and all its parents."""
+        if self.matches_dir(path):
+            return True
+        if not self.paths:
+            return False
+
+        current = os.path.normcase(os.path.abspath(path))
+        while True:
+            if current in self.paths:
+                return True
+            parent = os.path.dirname(current)
+            if parent == current:
+                return False
+            current = parent
+
+@lru_cache(maxsize=16)
+def _compile(excluded_folders):
+    return ExclusionMatcher(excluded_folders)
+
+def compile_exclusions(excluded_folders):
+    """Return the compiled matcher for a list of excluded folders, reusing it across calls."""
+    return _compile(tuple(excluded_folders or ()))
@@ -0,0 +1,99 @@
+import os
+import mmap
+import hashlib
+import threading
+from functools import lru_cache, partial
+from services.services import config, logger
+
+FALLBACK_ALGORITHM = "blake2b"
+
+def _load_xxhash():
+    import xxhash
+    return xxhash.xxh3_128
+
+def _load_blake3():
+    from blake3 import blake3
+    return blake3
+
+# Algorithm name -> loader returning a constructor of hashlib-style objects (update/digest).
+# xxh3_128 and blake3 need the optional xxhash / blake3 packages; blake2b is cut to 256 bits.
+HASH_ALGORITHMS = {
+    "sha256": lambda: hashlib.sha256,
+    "sha1": lambda: hashlib.sha1,
+    "blake2b": lambda: partial(hashlib.blake2b, digest_size=32),
+    "xxh3_128": _load_xxhash,
+    "blake3": _load_blake3,
+}
+
+
+class HashEngine:
+    """Content hashing with one algorithm, returning binary digests.
+
+    Files are read with readinto() into a buffer of block_size bytes that each thread reuses,
+    so hashing a file allocates nothing per block; with use_mmap the whole file is mapped and
+    handed to the digest in one call instead. Either way the digest is the same for a given
+    algorithm, and name identifies it wherever digests are stored.
+    """
+
+    def __init__(self, name, new_hasher, block_size=1024 * 1024, use_mmap=False):
+        self.name = name
+        self.new_hasher = new_hasher
+        self.block_size = max(int(block_size), 4096)
+        self.use_mmap = use_mmap
+        self._local = threading.local()
+
+    def _buffer(self):
+        view = getattr(self._local, "view", None)
+        if view is None:
+            view = self._local.view = memoryview(bytearray(self.block_size))
+        return view
+
+    def _update_from(self, hasher, f, length=None):
+        """Feed the next length bytes of f (all of it if None) to hasher through the reusable buffer."""
+        view = self._buffer()
+        while length is None or length > 0:
+            n = f.readinto(view if length is None or length >= self.block_size else view[:length])
+            if not n:
+                break
+            hasher.update(view[:n])
+            if length is not None:
+                length -= n
+
+    def hash_file(self, file_path):
+        """Digest of the whole file."""
+        hasher = self.new_hasher()
+        with open(file_path, "rb", buffering=0) as f:
+            if self.use_mmap and os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if hasattr(mapped, "madvise"):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    hasher.update(mapped)
+            else:
+                self._update_from(hasher, f)
+        return hasher.digest()
+
+    def hash_ranges(self, file_path, ranges):
+        """Digest of the given (offset, length) ranges of a file, fed in order."""
+        hasher = self.new_hasher()
+        with open(file_path, "rb", buffering=0) as f:
+            for offset, length in ranges:
+                f.seek(offset)
+                self._update_from(hasher, f, length)
+        return hasher.digest()
+
+
+@lru_cache(maxsize=4)
+def _build(algorithm, block_kb, use_mmap):
+    if algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"Unknown hash algorithm: {algorithm} (expected one of {', '.join(HASH_ALGORITHMS)})")
+    try:
+        new_hasher = HASH_ALGORITHMS[algorithm]()
+    except ImportError:
+        logger.warning(f"Warning: The {algorithm} backend is not installed; hashing with {FALLBACK_ALGORITHM} instead.")
+        algorithm, new_hasher = FALLBACK_ALGORITHM, HASH_ALGORITHMS[FALLBACK_ALGORITHM]()
+    return HashEngine(algorithm, new_hasher, block_kb * 1024, use_mmap)
+
+def get_hash_engine(algorithm=None):
+    """Return the HashEngine for hash_algorithm (or the given one), hash_block_kb and hash_mmap, built once."""
+    return _build(algorithm or config.get("hash_algorithm") or "sha256", int(config.get("hash_block_kb") or 1024),
+                  bool(config.get("hash_mmap")))
@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from services.services import config
+from core.progress import progress
+from core.metrics import metrics, timed
+
+def get_hash_workers():
+    """Number of hashing threads from config; 0 means one per CPU."""
+    workers = config.get("hash_workers")
+    if workers is None:
+        return 1
+    return int(workers) or os.cpu_count() or 1
+
+def get_max_inflight_bytes():
+    """Upper bound on the bytes being hashed concurrently, from config."""
+    return int(config.get("hash_max_inflight_mb") or 0) * 1024 * 1024
+
+def hash_files(items, hasher, workers=None, max_inflight_bytes=None):
+    """Hash files concurrently and yield (path, digest, error) in completion order.
+
+    items is an iterable of (path, nbytes) pairs, where nbytes is how much hasher will read.
+    A new file is only started while the bytes in flight stay under max_inflight_bytes, so a
+    slow disk is not flooded with parallel reads; a file bigger than the cap runs on its own.
+    Each file's time and bytes are recorded in the operation's metrics.
+    """
+    workers = workers or get_hash_workers()
+    if max_inflight_bytes is None:
+        max_inflight_bytes = get_max_inflight_bytes()
+
+    if workers <= 1:
+        for path, nbytes in items:
+            try:
+                (digest, seconds), error = timed(hasher, path), None
+                metrics.record_file(path, seconds)
+            except Exception as e:  # Reported like a failed future in the pooled branch below
+                digest, error = None, e
+            metrics.count("bytes_read", nbytes)
+            progress.advance(nbytes=nbytes)
+            yield path, digest, error
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        inflight_bytes = 0
+
+        def collect(return_when):
+            nonlocal inflight_bytes
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                path, nbytes = pending.pop(future)
+                inflight_bytes -= nbytes
+                error = future.exception()
+                digest = None
+                if error is None:
+                    digest, seconds = future.result()
+                    metrics.record_file(path, seconds)
+                metrics.count("bytes_read", nbytes)
+                progress.advance(nbytes=nbytes)
+                yield path, digest, error
+
+        try:
+            for path, nbytes in items:
+                while pending and (len(pending) >= workers * 2 or
+                                   (max_inflight_bytes and inflight_bytes + nbytes > max_inflight_bytes)):
+                    yield from collect(FIRST_COMPLETED)
+                pending[executor.submit(timed, hasher, path)] = (path, nbytes)
+                inflight_bytes += nbytes
+
+            while pending:
+                yield from collect(FIRST_COMPLETED)
+        finally:
+            # Cancelled or abandoned by the caller: do not start the files still queued
+            for future in pending:
+                future.cancel()
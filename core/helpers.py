@@ -1,19 +1,11 @@
 import os
-import shutil
-import hashlib
+import sys
+from core.exclusions import compile_exclusions
 
 def ensure_directory_exists(directory):
     """Ensure that the given directory exists, creating it if necessary."""
     os.makedirs(directory, exist_ok=True)
 
-def get_file_hash(file_path, algorithm="sha256"):
-    """Generate a hash for a given file using the specified algorithm (default: SHA256)."""
-    hash_func = hashlib.new(algorithm)
-    with open(file_path, "rb") as f:
-        while chunk := f.read(8192):
-            hash_func.update(chunk)
-    return hash_func.hexdigest()
-
 def is_folder_empty(folder_path):
     """Check if a folder is empty."""
     return not os.listdir(folder_path)
@@ -23,27 +15,23 @@ class FileMoveError(Exception):
     """Custom exception for file movement failures."""
     pass
 
-def safe_move_file(src, dest):
-    """Move a file to the destination, avoiding overwrites by appending a counter."""
-    base, ext = os.path.splitext(dest)
-    counter = 1
-    while os.path.exists(dest):
-        dest = f"{base}_{counter}{ext}"
-        counter += 1
-    try:
-        shutil.move(src, dest)
-        return dest
-    except Exception as e:
-        raise FileMoveError(f"Failed to move {src} to {dest}: {e}")
-
-
 def bytes_to_mb(size_in_bytes):
     """Convert bytes to megabytes (MB)."""
     return size_in_bytes / (1024 * 1024)
 
+def get_peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where the platform does not report it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return round(peak / 1024 if sys.platform != "darwin" else bytes_to_mb(peak), 1)
+
 def is_excluded_path(path, excluded_folders):
-    """Check if a path should be excluded based on defined folders."""
-    return any(os.path.commonpath([path, os.path.abspath(folder)]) == os.path.abspath(folder) for folder in excluded_folders)
+    """Check if a path should be excluded based on defined folders (names, glob patterns or paths)."""
+    return compile_exclusions(excluded_folders).is_excluded(path)
 
 class DirectoryNotFoundError(Exception):
     """Custom exception for when the source directory is missing."""
@@ -74,11 +62,3 @@ def safe_create_directory(parent_path, folder_name):
 
     os.makedirs(candidate)
     return candidate
-
-def get_nonconflicting_path(path):
-    base, ext = os.path.splitext(path)
-    counter = 1
-    while os.path.exists(path):
-        path = f"{base}_{counter}{ext}"
-        counter += 1
-    return path
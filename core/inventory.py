@@ -0,0 +1,113 @@
+import os
+from collections import namedtuple
+from core.exclusions import compile_exclusions
+from core.progress import progress
+from core.metrics import metrics
+from core.rules import get_rules
+from services.services import logger
+
+# category is the FileClass the rules assign to the file when it is listed
+FileEntry = namedtuple("FileEntry", ["path", "name", "ext", "size", "mtime_ns", "inode", "category"])
+
+class Inventory:
+    """Listing of a source tree collected in a single os.scandir pass.
+
+    Files keep the order os.walk would visit them in. Directories track how many entries
+    they hold, so operations that delete or move files can keep the inventory in sync and
+    later operations (e.g. deleting empty folders) never have to list the tree again.
+    """
+
+    def __init__(self, source_dir):
+        self.source_dir = source_dir
+        self.files = {}         # path -> FileEntry
+        self.dir_entries = {}   # directory path -> number of entries inside it
+        self.dir_order = []     # directories in top-down visiting order
+
+    def iter_files(self):
+        """Snapshot of the file entries, safe to iterate while removing files."""
+        return list(self.files.values())
+
+    def iter_dirs_bottom_up(self):
+        """Directories below the source directory, children before their parents."""
+        return [path for path in reversed(self.dir_order) if path in self.dir_entries and path != self.source_dir]
+
+    def is_dir_empty(self, path):
+        return self.dir_entries.get(path) == 0
+
+    def remove_file(self, path):
+        """Forget a file that was deleted or moved out of the tree."""
+        if self.files.pop(path, None) is not None:
+            self._decrement(os.path.dirname(path))
+
+    def remove_dir(self, path):
+        """Forget a directory that was deleted."""
+        if self.dir_entries.pop(path, None) is not None:
+            self._decrement(os.path.dirname(path))
+
+    def _decrement(self, parent):
+        if parent in self.dir_entries:
+            self.dir_entries[parent] -= 1
+
+
+def scan_tree(source_dir, excluded_folders, rules=None):
+    """Walk source_dir with os.scandir, skipping excluded directories, one directory at a time.
+
+    Yields (directory, number of entries, [FileEntry, ...]) top-down, in the order os.walk
+    visits them, so callers can stream over huge trees without holding the whole listing.
+    Each file is classified once here (see RuleSet); operations dispatch on entry.category.
+    """
+    rules = rules or get_rules()
+    matcher = compile_exclusions(excluded_folders)
+    if matcher.is_excluded(source_dir):
+        return
+
+    stack = [source_dir]
+    while stack:
+        progress.check_cancelled()
+        current = stack.pop()
+        entry_count = 0
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    entry_count += 1
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+
+                    if is_dir:
+                        # Like os.walk, symlinked directories are listed but not followed
+                        if not entry.is_symlink() and not matcher.matches_dir(entry.path, entry.name):
+                            subdirs.append(entry.path)
+                        continue
+
+                    try:
+                        st = entry.stat()
+                    except OSError as e:
+                        logger.warning(f"Warning: Could not stat {entry.path}: {e}")
+                        continue
+                    ext = os.path.splitext(entry.name)[1].lower()
+                    files.append(FileEntry(
+                        entry.path, entry.name, ext, st.st_size, st.st_mtime_ns, st.st_ino,
+                        rules.classify(entry.name, ext, st.st_size, st.st_mtime_ns)
+                    ))
+        except OSError as e:
+            logger.warning(f"Warning: Could not list {current}: {e}")
+            entry_count = 1  # Never treat an unreadable folder as empty
+
+        metrics.count("stats", entry_count)
+        yield current, entry_count, files
+        stack.extend(reversed(subdirs))
+
+def build_inventory(source_dir, excluded_folders):
+    """Walk source_dir once with os.scandir, skipping excluded directories."""
+    inventory = Inventory(source_dir)
+    progress.phase("Listing files")
+    for current, entry_count, files in scan_tree(source_dir, excluded_folders):
+        for entry in files:
+            inventory.files[entry.path] = entry
+        inventory.dir_entries[current] = entry_count
+        inventory.dir_order.append(current)
+    return inventory
@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+from core.helpers import ensure_directory_exists, FileMoveError
+from core.mover import FileMover
+from core.progress import progress
+from core.metrics import metrics, timed
+from core.wrappers import operation_wrapper, with_dry_run
+from services.services import config, logger, JOURNAL_DIR
+
+SYNC_INTERVAL_SECONDS = 2.0
+
+class MoveJournal:
+    """Append-only JSON-lines journal of the moves made by one operation.
+
+    A run writes a "start" record, one "plan" record per move and a "planned" marker (fsynced
+    before anything is moved), then a "done", "skipped" or "failed" record per move and finally
+    "complete". "done" records are fsynced in batches. The active journal of an operation over a
+    folder lives at <JOURNAL_DIR>/<operation>.<folder key>.jsonl, so interrupted runs over other
+    folders are left alone, and is archived under a timestamped name once complete.
+    """
+
+    def __init__(self, operation, source_dir):
+        self.operation = operation
+        self.source_dir = source_dir
+        folder_key = hashlib.sha1(os.path.normcase(os.path.abspath(source_dir)).encode("utf-8")).hexdigest()[:12]
+        self.path = os.path.join(JOURNAL_DIR, f"{operation}.{folder_key}.jsonl")
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._next_id = 0
+
+    def _append(self, record, force_sync=False):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._unsynced += 1
+        sync_every = int(config.get("journal_sync_every") or 500)
+        if force_sync or self._unsynced >= sync_every or time.monotonic() - self._last_sync > SYNC_INTERVAL_SECONDS:
+            self.sync()
+
+    def sync(self):
+        """Flush buffered records and fsync them to disk."""
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def _read_state(self):
+        """Return (header, planned, entries by id, finished ids) of the active journal."""
+        header, planned, entries, finished = None, False, {}, set()
+        for record in read_records(self.path):
+            kind = record.get("type")
+            if kind == "start":
+                header = record
+            elif kind == "plan":
+                entries[record["id"]] = record
+            elif kind == "planned":
+                planned = True
+            elif kind in ("done", "skipped", "failed"):
+                finished.add(record["id"])
+        return header, planned, entries, finished
+
+    def is_interrupted(self):
+        """True if a run over this folder was planned but never completed."""
+        if not os.path.exists(self.path):
+            return False
+        header, planned, _, _ = self._read_state()
+        return bool(header and planned)
+
+    def resume(self):
+        """Return the moves still pending from an interrupted run over the folder, or None if there is nothing to resume."""
+        if not os.path.exists(self.path):
+            return None
+
+        header, planned, entries, finished = self._read_state()
+        if not header or not planned:
+            # Interrupted while planning: nothing has been moved yet, start over
+            self._archive("abandoned")
+            return None
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._next_id = max(entries, default=-1) + 1
+        return [entry for entry_id, entry in sorted(entries.items()) if entry_id not in finished]
+
+    def start(self):
+        ensure_directory_exists(JOURNAL_DIR)
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._append({"type": "start", "operation": self.operation, "source_dir": self.source_dir,
+                      "started": datetime.now().isoformat(timespec="seconds")})
+
+    def plan(self, entry):
+        """Record a planned move; returns the entry with its journal id."""
+        entry = dict(entry, type="plan", id=self._next_id)
+        self._next_id += 1
+        self._append(entry)
+        return entry
+
+    def mark_planned(self):
+        self._append({"type": "planned"}, force_sync=True)
+
+    def done(self, entry_id, dest):
+        self._append({"type": "done", "id": entry_id, "dest": dest})
+
+    def skipped(self, entry_id, reason):
+        self._append({"type": "skipped", "id": entry_id, "reason": reason})
+
+    def failed(self, entry_id, error):
+        self._append({"type": "failed", "id": entry_id, "error": error})
+
+    def finish(self):
+        """Mark the run complete and archive the journal so it can be undone later."""
+        self._append({"type": "complete"}, force_sync=True)
+        return self._archive("complete")
+
+    def _archive(self, status):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        archived_path = os.path.join(JOURNAL_DIR, f"{self.operation}_{stamp}.{status}.jsonl")
+        os.replace(self.path, archived_path)
+        return archived_path
+
+
+def read_records(path):
+    """Yield the records of a journal file, ignoring a torn last line from a crash."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Warning: Ignoring a damaged journal line in {path}")
+
+def describe_move(entry, dest=None, verb="Moved"):
+    """One log line for a planned or finished move, e.g. "[Unsorted] Moved: a → b"."""
+    dest = dest or entry["dest"]
+    reason = entry.get("reason")
+    if reason == "unsorted":
+        return f"[Unsorted] {verb}: {entry['src']} → {dest}"
+    if reason == "duplicate":
+        return f"{verb} duplicate: {entry['src']} → {dest} (kept {entry.get('keeper')})"
+    if reason == "near_duplicate":
+        return f"{verb} near-duplicate: {entry['src']} → {dest} (similar to {entry.get('keeper')}, distance {entry.get('distance')})"
+    return f"{verb}: {entry['src']} → {dest}"
+
+def run_journaled_moves(operation, source_dir, build_plan, on_moved=None):
+    """Execute the moves produced by build_plan() under a journal.
+
+    build_plan yields dicts with at least "src", "dest" and "reason". If an earlier run of the
+    same operation over the same folder was interrupted after planning, its remaining moves are
+    finished first under its own journal, without extracting any metadata again; build_plan()
+    then runs as usual, so the moves this call asked for are never dropped.
+    on_moved(src, dest) is called after each successful move.
+    """
+    journal = MoveJournal(operation, source_dir)
+    entries = journal.resume()
+    if entries is not None:
+        logger.info(f"Resuming interrupted {operation}: {len(entries)} moves left.")
+        execute_journaled_moves(journal, entries, on_moved)
+        journal = MoveJournal(operation, source_dir)
+
+    journal.start()
+    entries = [journal.plan(entry) for entry in build_plan()]
+    journal.mark_planned()
+    return execute_journaled_moves(journal, entries, on_moved)
+
+def execute_journaled_moves(journal, entries, on_moved=None):
+    """Make the planned moves of a journal, recording each outcome; returns the archived journal."""
+    mover = FileMover()
+    moved = 0
+    progress.phase("Moving", total_files=len(entries))
+    for entry in entries:
+        progress.advance()
+        src, dest = entry["src"], entry["dest"]
+        if not os.path.exists(src):
+            # Moved before the last journal sync, or removed by someone else
+            logger.warning(f"Warning: Source no longer exists, skipping: {src}")
+            journal.skipped(entry["id"], "missing source")
+            continue
+
+        try:
+            actual_dest, seconds = timed(mover.move, src, dest)
+        except FileMoveError as e:
+            logger.warning(f"Failed to move file: {e}")
+            journal.failed(entry["id"], str(e))
+            continue
+        journal.done(entry["id"], actual_dest)
+        metrics.record_file(src, seconds)
+        moved += 1
+        if on_moved:
+            on_moved(src, actual_dest)
+        logger.event(f"moved_{entry.get('reason', 'file')}", describe_move(entry, actual_dest), src=src, dest=actual_dest)
+
+    archived_path = journal.finish()
+    logger.info(f"{journal.operation}: moved {moved} of {len(entries)} files. Journal: {archived_path}")
+    mover.log_stats(journal.operation)
+    return archived_path
+
+def find_latest_journal(source_dir, operation=None):
+    """Return the newest completed journal for source_dir (optionally for one operation), or None."""
+    if not os.path.isdir(JOURNAL_DIR):
+        return None
+    candidates = sorted(
+        (name for name in os.listdir(JOURNAL_DIR)
+         if name.endswith(".complete.jsonl") and (operation is None or name.startswith(f"{operation}_"))),
+        key=lambda name: os.path.getmtime(os.path.join(JOURNAL_DIR, name)),
+        reverse=True
+    )
+    for name in candidates:
+        path = os.path.join(JOURNAL_DIR, name)
+        header = next(read_records(path), {})
+        if header.get("source_dir") == source_dir:
+            return path
+    return None
+
+def undo_journal(journal_path, dry_run=False):
+    """Move every completed entry of a journal back to its original path, newest first."""
+    entries = {}
+    moves = []
+    for record in read_records(journal_path):
+        if record.get("type") == "plan":
+            entries[record["id"]] = record["src"]
+        elif record.get("type") == "done" and record.get("dest"):
+            moves.append((entries[record["id"]], record["dest"]))
+
+    mover = FileMover()
+    restored = 0
+    progress.phase("Moving back", total_files=len(moves))
+    for src, dest in reversed(moves):
+        progress.advance()
+        if not os.path.exists(dest):
+            logger.warning(f"Warning: Cannot undo, file is gone: {dest}")
+            continue
+        if dry_run:
+            logger.event("would_move_back", f"[DRY RUN] Would move back: {dest} → {src}", src=dest, dest=src)
+            continue
+
+        try:
+            restored_path = mover.move(dest, src)
+        except FileMoveError as e:
+            logger.warning(f"Failed to move file: {e}")
+            continue
+        restored += 1
+        logger.event("moved_back", f"Moved back: {dest} → {restored_path}", src=dest, dest=restored_path)
+
+    if not dry_run:
+        os.replace(journal_path, journal_path.replace(".complete.jsonl", ".undone.jsonl"))
+    logger.info(f"Undo restored {restored} of {len(moves)} moves from {journal_path}")
+    if not dry_run:
+        mover.log_stats("undo")
+    return restored
+
+@operation_wrapper
+@with_dry_run(default=False)
+def undo_moves(source_dir, dry_run, operation=None, journal_path=None):
+    """Revert the most recent journaled run over the source directory (optionally of one operation)."""
+    journal_path = journal_path or find_latest_journal(source_dir, operation)
+    if not journal_path:
+        logger.info("No completed run to undo for this folder.")
+        return 0
+    return undo_journal(journal_path, dry_run=dry_run)
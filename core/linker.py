@@ -0,0 +1,78 @@
+import os
+import errno
+import filecmp
+import shutil
+
+FICLONE = 0x40049409  # Linux ioctl: share all extents of another file (Btrfs, XFS, bcachefs, ...)
+LINK_MODES = ("hardlink", "reflink", "auto")
+
+class LinkNotSupportedError(Exception):
+    """Raised when a file system (or platform) cannot link or clone the two files."""
+    pass
+
+def reflink_file(src, dest):
+    """Create dest as a copy-on-write clone of src. Raises LinkNotSupportedError where cloning is unavailable."""
+    try:
+        import fcntl
+    except ImportError:
+        raise LinkNotSupportedError("Reflinks are only supported on Linux")
+
+    with open(src, "rb") as f_in, open(dest, "xb") as f_out:
+        try:
+            fcntl.ioctl(f_out.fileno(), FICLONE, f_in.fileno())
+            return
+        except OSError as e:
+            error = e
+
+    os.remove(dest)
+    if error.errno in (errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.EINVAL, errno.ENOTTY):
+        raise LinkNotSupportedError(f"File system does not support reflinks: {error}")
+    raise error
+
+def hardlink_file(src, dest):
+    """Create dest as a hardlink to src. Raises LinkNotSupportedError across devices or on file systems without links."""
+    try:
+        os.link(src, dest)
+    except OSError as e:
+        if e.errno in (errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EMLINK):
+            raise LinkNotSupportedError(f"Cannot hardlink: {e}")
+        raise
+
+def replace_with_link(keeper, duplicate, mode="hardlink"):
+    """Replace duplicate by a hardlink or reflink to keeper, after checking both hold the same bytes.
+
+    The link is created next to the duplicate under a temporary name and then renamed over it,
+    so the duplicate's path never stops working. Reflinks keep the duplicate's own timestamps
+    and permissions; hardlinks share the keeper's. mode="auto" tries a reflink, then a hardlink.
+    Returns the mode that was used. Raises ValueError if the contents differ.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode: {mode}")
+    if not filecmp.cmp(keeper, duplicate, shallow=False):
+        raise ValueError(f"{duplicate} does not match {keeper}, leaving it alone")
+
+    directory, name = os.path.split(duplicate)
+    temp_path = os.path.join(directory, f".{name}.purespace-link")
+    if os.path.lexists(temp_path):
+        os.remove(temp_path)
+
+    used = None
+    for candidate in (("reflink", "hardlink") if mode == "auto" else (mode,)):
+        try:
+            if candidate == "reflink":
+                reflink_file(keeper, temp_path)
+                shutil.copystat(duplicate, temp_path)
+            else:
+                hardlink_file(keeper, temp_path)
+            used = candidate
+            break
+        except LinkNotSupportedError:
+            if candidate == "hardlink" or mode != "auto":
+                raise
+
+    try:
+        os.replace(temp_path, duplicate)
+    except OSError:
+        os.remove(temp_path)
+        raise
+    return used
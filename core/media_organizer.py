@@ -1,16 +1,38 @@
 import os
-from core.helpers import ensure_directory_exists, is_excluded_path, safe_move_file, get_file_hash, validate_source_dir
-from core.wrappers import operation_wrapper,with_dry_run,walk_directory
+from core.helpers import ensure_directory_exists, is_excluded_path, bytes_to_mb
+from core.wrappers import operation_wrapper,with_dry_run
+from core.scan_index import cached_capture_date, scan_index
+from core.date_sources import get_date_sources, date_from_filename, date_from_sidecar
+from core.metadata import read_container_creation_time, read_exif_date_original, UnsupportedContainerError, UnsupportedImageError
+from core.journal import run_journaled_moves
+from core.plan import write_plan
+from core.linker import replace_with_link, LinkNotSupportedError
+from core.perceptual import find_near_duplicate_groups
+from core.progress import progress
+from core.metrics import metrics
+from core.inventory import scan_tree
+from core.rules import get_rules
+from core.hash_engine import get_hash_engine
+from core.dedupe import find_duplicate_groups, list_media_files, walk_media_files, keeper_sort_key, new_duplicate_stats, log_duplicate_stats, REVIEW_FOLDERS
 from services.services import config
 from services.services import logger
 from PIL import Image, UnidentifiedImageError
 from datetime import datetime
 import subprocess
+from collections import defaultdict
 import shutil
 
 
-def get_image_date(file_path):
-    """Extracts image creation date from Exif metadata, otherwise falls back to file creation date."""
+def read_image_exif_date(file_path):
+    """Reads the Exif "DateTimeOriginal" of an image, or returns None if it has none.
+
+    JPEG and TIFF-based files are read from their header bytes; other formats are opened with Pillow.
+    """
+    try:
+        return read_exif_date_original(file_path)
+    except UnsupportedImageError:
+        pass
+
     try:
         with Image.open(file_path) as img:
             exif_data = img._getexif()
@@ -20,15 +42,46 @@ def get_image_date(file_path):
                     return datetime.strptime(date_str, "%Y:%m:%d %H:%M:%S")
     except (UnidentifiedImageError, AttributeError, KeyError, ValueError):
         pass
+    return None
+
+def get_media_date(file_path, extractor, media_kind):
+    """Return (date, source) from the first of the date_sources that knows the date, or (None, None).
 
+    source is "metadata", "sidecar", "filename" or "mtime" (see core.date_sources). Putting
+    "filename" or "sidecar" before "metadata" dates such files without opening them.
+    """
+    for source in get_date_sources():
+        if source == "metadata":
+            file_date = cached_capture_date(file_path, extractor, media_kind=media_kind)
+        elif source == "sidecar":
+            file_date = date_from_sidecar(file_path)
+        elif source == "filename":
+            file_date = date_from_filename(os.path.basename(file_path))
+        else:
+            try:
+                file_date = datetime.fromtimestamp(os.path.getmtime(file_path))
+            except OSError:
+                logger.warning(f"Warning: Could not access file date for {file_path}")
+                continue
+        if file_date:
+            metrics.count(f"dates_from_{source}")
+            return file_date, source
+    return None, None
+
+def get_image_date(file_path):
+    """Extracts image creation date from the configured date sources (Exif metadata first by default)."""
+    return get_media_date(file_path, read_image_exif_date, "image")[0]
+
+def read_video_creation_date(file_path):
+    """Reads the container creation time of a video, or returns None if it has none.
+
+    MP4/MOV/3GP and MKV/WebM headers are parsed directly; other formats use FFmpeg's `ffprobe`.
+    """
     try:
-        return datetime.fromtimestamp(os.path.getmtime(file_path))
-    except OSError:
-        logger.warning(f"Warning: Could not access file date for {file_path}")
-        return None
+        return read_container_creation_time(file_path)
+    except UnsupportedContainerError:
+        pass
 
-def get_video_date(file_path):
-    """Extracts video creation date using FFmpeg's `ffprobe`. Falls back to modified date if metadata is missing."""
     try:
         cmd = [
             "ffprobe",
@@ -38,20 +91,20 @@ def get_video_date(file_path):
             "-of", "default=noprint_wrappers=1:nokey=1",
             file_path
         ]
+        metrics.count("subprocesses")
         result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
         date_str = result.stdout.strip()
 
         if date_str:
             return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%fZ")
 
-    except (subprocess.SubprocessError, ValueError):
-        pass
-    # Fallback: Use last modified date
-    try:
-        return datetime.fromtimestamp(os.path.getmtime(file_path))
-    except OSError:
-        logger.warning(f"Warning: Could not access file date for {file_path}")
-        return None
+    except (subprocess.SubprocessError, ValueError, OSError):
+        pass  # OSError: ffprobe is not installed, so the next date source is used
+    return None
+
+def get_video_date(file_path):
+    """Extracts video creation date from the configured date sources (container header or `ffprobe` first by default)."""
+    return get_media_date(file_path, read_video_creation_date, "video")[0]
 
 def check_ffmpeg_installed():
     """Check if FFmpeg is installed on the system."""
@@ -63,14 +116,25 @@ def check_ffmpeg_installed():
         logger.error("FFmpeg is not installed. Please install FFmpeg to process videos.")
         return False
 
-@operation_wrapper
-@with_dry_run(default=False)
-def organize_media_by_date(source_dir, dry_run, merge_media=True):
-    """Organize images and videos into year/month folders. Optionally merge them into separate folders."""
-    image_extensions = config.get("image_extensions")
-    video_extensions = config.get("video_extensions")
-    excluded_folders = config.get("excluded_folders")
+def iter_source_files(source_dir, inventory=None):
+    """Yield the FileEntry (with its category, see RuleSet) of every file to organize.
+
+    An inventory (see build_inventory) is reused when given, so a pipeline lists the tree once;
+    otherwise the source directory is streamed with scan_tree, skipping excluded folders.
+    """
+    if inventory is not None:
+        yield from inventory.iter_files()
+        return
+
+    for _, _, files in scan_tree(source_dir, config.get("excluded_folders")):
+        yield from files
 
+def plan_media_moves(source_dir, merge_media=True, inventory=None):
+    """Yield the planned move of every image and video to organize.
+
+    Each entry holds src, dest and reason ("dated" or "unsorted") plus the evidence behind it:
+    the date, which of the date_sources it came from and the size/mtime of the source.
+    """
     # Choose destination folders based on merge setting
     base_folder = os.path.join(source_dir, "Sorted_Media")
     media_folder = base_folder if merge_media else None
@@ -78,58 +142,120 @@ def organize_media_by_date(source_dir, dry_run, merge_media=True):
     video_folder = media_folder if merge_media else os.path.join(base_folder, "Videos")
 
     # Process both images and videos
-    for root, _, files in walk_directory(source_dir, excluded_folders):
-        for file in files:
-            file_ext = os.path.splitext(file)[1].lower()
-            file_path = os.path.join(root, file)
-
-            # Handle Images
-            if file_ext in image_extensions:
-                file_date = get_image_date(file_path)
-                target_folder = image_folder
-            # Handle Videos
-            elif file_ext in video_extensions:
-                file_date = get_video_date(file_path)
-                target_folder = video_folder
-            else:
-                continue
+    progress.phase("Reading dates", total_files=len(inventory.files) if inventory is not None else None)
+    for entry in iter_source_files(source_dir, inventory):
+        progress.advance()
+        file_path, file = entry.path, entry.name
 
-            # Handle missing metadata
-            if not file_date or file_date.year < 1990 or file_date.year > datetime.now().year:
-                unsorted_folder = os.path.join(target_folder, "Unsorted")
-                ensure_directory_exists(unsorted_folder)
-                new_file_path = os.path.join(unsorted_folder, file)
-
-                if dry_run:
-                    logger.info(f"[DRY RUN] Would move to Unsorted: {file_path} → {new_file_path}")
-                else:
-                    safe_move_file(file_path, new_file_path)
-                    logger.info(f"[Unsorted] Moved: {file_path} → {new_file_path}")
-                continue
+        # Handle Images
+        if entry.category.kind == "image":
+            file_date, date_source = get_media_date(file_path, read_image_exif_date, "image")
+            target_folder = image_folder
+        # Handle Videos
+        elif entry.category.kind == "video":
+            file_date, date_source = get_media_date(file_path, read_video_creation_date, "video")
+            target_folder = video_folder
+        else:
+            continue
 
-            # Organize by Year/Month
-            year, month = file_date.strftime("%Y"), file_date.strftime("%m")
-            dest_folder = os.path.join(target_folder, year, month)
-            ensure_directory_exists(dest_folder)
+        evidence = {
+            "size": entry.size,
+            "mtime_ns": entry.mtime_ns,
+            "date": file_date.isoformat() if file_date else None,
+            "date_source": date_source,
+        }
 
-            # Move the file
-            new_file_path = os.path.join(dest_folder, file)
-            if dry_run:
-                logger.info(f"[DRY RUN] Would move: {file_path} → {new_file_path}")
-            else:
-                safe_move_file(file_path, new_file_path)
-                logger.info(f"Moved: {file_path} → {new_file_path}")
+        # Handle missing metadata
+        if not file_date or file_date.year < 1990 or file_date.year > datetime.now().year:
+            new_file_path = os.path.join(target_folder, "Unsorted", file)
+            yield dict(evidence, src=file_path, dest=new_file_path, reason="unsorted")
+            continue
+
+        # Organize by Year/Month
+        year, month = file_date.strftime("%Y"), file_date.strftime("%m")
+        new_file_path = os.path.join(target_folder, year, month, file)
+        yield dict(evidence, src=file_path, dest=new_file_path, reason="dated")
 
 @operation_wrapper
 @with_dry_run(default=False)
-def move_media_duplicates(source_dir, dry_run):
-    """Move duplicate media files (images/videos) within each month folder under Sorted_Media."""
+def organize_media_by_date(source_dir, dry_run, merge_media=True, inventory=None, on_moved=None):
+    """Organize images and videos into year/month folders. Optionally merge them into separate folders.
+
+    Moves are planned first and recorded in a journal, so an interrupted run resumes where it
+    stopped and a finished run can be reverted with undo_moves. A dry run writes the plan to a
+    file instead (returned), which apply_plan can execute later without reading metadata again.
+    Moved files are removed from the inventory, if one is shared, and reported to on_moved(src, dest).
+    """
+    build_plan = lambda: plan_media_moves(source_dir, merge_media, inventory)
+    if dry_run:
+        return write_plan("organize_media_by_date", source_dir, build_plan())
+
+    def after_move(src, dest):
+        if inventory is not None:
+            inventory.remove_file(src)
+        index_file(dest)
+        if on_moved:
+            on_moved(src, dest)
+
+    return run_journaled_moves("organize_media_by_date", source_dir, build_plan, on_moved=after_move)
+
+def index_file(file_path):
+    """Give file_path a row in the scan index (if it has none), so paths_with_size finds it by size."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return
+    if scan_index.enabled and scan_index.lookup(file_path, st) is None:
+        scan_index.store(file_path, st)
+
+def index_sorted_media(source_dir):
+    """Add every file under Sorted_Media that the scan index does not know yet (one listing, no reads).
+
+    Organizing indexes the files it moves, but files dated from their name, a sidecar or mtime
+    before that, or placed by hand, may be missing; watch mode calls this once at startup.
+    """
+    if not scan_index.enabled:
+        return
     sorted_media_dir = os.path.join(source_dir, "Sorted_Media")
-    excluded_folders = config.get("excluded_folders")
-    media_extensions = config.get("image_extensions") + config.get("video_extensions")
+    for path, _ in walk_media_files(sorted_media_dir, get_rules().media_extensions, []):
+        index_file(path)
+    scan_index.commit()
 
+def get_review_folder(source_dir, scope, file_path, folder_name):
+    """Where a file flagged against its keeper goes: a folder_name folder next to it, or for the
+    "source" scope the same relative folder under <source>/<folder_name>."""
+    if scope != "source":
+        return os.path.join(os.path.dirname(file_path), folder_name)
+    relative_dir = os.path.relpath(os.path.dirname(file_path), source_dir)
+    return os.path.normpath(os.path.join(source_dir, folder_name, relative_dir))
+
+def iter_duplicate_scan_sets(source_dir, scope, media_extensions):
+    """Yield (media_files, review_folder_for) for each set of files compared against each other.
+
+    scope="month" compares files within each Sorted_Media year/month folder, "library" compares
+    every file under Sorted_Media, and "source" compares every media file in the source directory.
+    media_files is a list of (path, size) sorted by keeper preference, and
+    review_folder_for(file_path, folder_name) is where a file flagged against its keeper goes.
+    """
+    sorted_media_dir = os.path.join(source_dir, "Sorted_Media")
+    excluded_folders = config.get("excluded_folders")
     ensure_directory_exists(sorted_media_dir)
 
+    if scope in ("library", "source"):
+        # Sorted_Media is managed by this tool, so exclusions such as "Unsorted" only apply to the source scope
+        scan_root = sorted_media_dir if scope == "library" else source_dir
+        scan_excluded = [] if scope == "library" else excluded_folders
+        logger.info(f"Scanning for duplicates across: {scan_root}")
+
+        def review_folder_for(file_path, folder_name):
+            return get_review_folder(source_dir, scope, file_path, folder_name)
+
+        # Sorting by the keeper preference makes group[0] the file that is kept
+        media_files = walk_media_files(scan_root, media_extensions, scan_excluded)
+        media_files.sort(key=lambda item: keeper_sort_key(item[0], scan_root))
+        yield media_files, review_folder_for
+        return
+
     # Walk through each year and month folder
     for year in os.listdir(sorted_media_dir):
         year_path = os.path.join(sorted_media_dir, year)
@@ -142,50 +268,229 @@ def move_media_duplicates(source_dir, dry_run):
                 continue
 
             logger.info(f"Scanning for duplicates in: {month_path}")
-            file_hashes = {}  # Reset hashes for each month
-            duplicates_folder = os.path.join(month_path, "Duplicates")
-            ensure_directory_exists(duplicates_folder)
-
-            # Scan all files in the current month folder
-            for file in os.listdir(month_path):
-                file_path = os.path.join(month_path, file)
-                if not os.path.isfile(file_path):
+            media_files = list_media_files(month_path, media_extensions)
+            yield media_files, lambda _, folder_name, month_path=month_path: os.path.join(month_path, folder_name)
+
+def plan_duplicate_moves(source_dir, scope):
+    """Yield the planned move of every duplicate media file, with the keeper and content hash as evidence.
+
+    See iter_duplicate_scan_sets for the scopes.
+    """
+    media_extensions = get_rules().media_extensions
+    hash_algorithm = get_hash_engine().name
+    stats = new_duplicate_stats()
+    hashes = {}
+
+    for media_files, review_folder_for in iter_duplicate_scan_sets(source_dir, scope, media_extensions):
+        sizes = dict(media_files)
+        # Only files that share a size and a sample hash are hashed in full
+        for group in find_duplicate_groups(media_files, stats, hashes):
+            for file_path in group[1:]:
+                try:
+                    mtime_ns = os.stat(file_path).st_mtime_ns
+                except OSError:
+                    logger.warning(f"Warning: Could not access {file_path}")
+                    continue
+                dest = os.path.join(review_folder_for(file_path, "Duplicates"), os.path.basename(file_path))
+                yield {"src": file_path, "dest": dest, "reason": "duplicate", "size": sizes[file_path],
+                       "mtime_ns": mtime_ns, "keeper": group[0], "hash": hashes[file_path].hex() if file_path in hashes else None,
+                       "hash_algorithm": hash_algorithm}
+
+    log_duplicate_stats(stats)
+
+def plan_new_duplicate_moves(source_dir, new_files, scope):
+    """Yield the planned move of duplicates among newly organized files, without rescanning the library.
+
+    Each new file is only compared with files of the same size: those in its own folder for the
+    "month" scope, or those the scan index knows under Sorted_Media for the other scopes (see
+    index_sorted_media), so the work grows with the number of new files. With use_scan_index off,
+    Sorted_Media is listed instead. Groups are formed and moved as in plan_duplicate_moves.
+    """
+    sorted_media_dir = os.path.join(source_dir, "Sorted_Media")
+    excluded_folders = config.get("excluded_folders")
+    media_extensions = get_rules().media_extensions
+    hash_algorithm = get_hash_engine().name
+    stats = new_duplicate_stats()
+    hashes = {}
+
+    # Group the new files by the set they are compared in (their month folder, or the whole library)
+    scan_sets = defaultdict(list)
+    for file_path in new_files:
+        folder = os.path.dirname(file_path)
+        if scope == "month" and is_excluded_path(folder, excluded_folders):
+            continue
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            continue
+        scan_sets[folder if scope == "month" else sorted_media_dir].append((file_path, size))
+
+    for scan_root, files in scan_sets.items():
+        new_paths = {path for path, _ in files}
+        candidates = dict(files)
+        sizes = set(candidates.values())
+        if scope == "month":
+            known = (item for item in list_media_files(scan_root, media_extensions) if item[1] in sizes)
+        elif scan_index.enabled:
+            known = ((path, size) for size in sizes for path in scan_index.paths_with_size(size, under=scan_root)
+                     if os.path.splitext(path)[1].lower() in media_extensions
+                     and REVIEW_FOLDERS.isdisjoint(os.path.relpath(path, scan_root).split(os.sep))
+                     and os.path.isfile(path) and os.path.getsize(path) == size)
+        else:
+            # Without the index the library has to be listed (Sorted_Media is managed, so no exclusions)
+            known = (item for item in walk_media_files(scan_root, media_extensions, []) if item[1] in sizes)
+        for path, size in known:
+            candidates.setdefault(path, size)
+
+        media_files = sorted(candidates.items(), key=lambda item: keeper_sort_key(item[0], scan_root))
+        for group in find_duplicate_groups(media_files, stats, hashes):
+            if new_paths.isdisjoint(group):
+                continue
+            for file_path in group[1:]:
+                try:
+                    mtime_ns = os.stat(file_path).st_mtime_ns
+                except OSError:
+                    logger.warning(f"Warning: Could not access {file_path}")
                     continue
+                dest = os.path.join(get_review_folder(source_dir, scope, file_path, "Duplicates"), os.path.basename(file_path))
+                yield {"src": file_path, "dest": dest, "reason": "duplicate", "size": candidates[file_path],
+                       "mtime_ns": mtime_ns, "keeper": group[0], "hash": hashes[file_path].hex() if file_path in hashes else None,
+                       "hash_algorithm": hash_algorithm}
+
+    log_duplicate_stats(stats)
+
+def plan_near_duplicate_moves(source_dir, scope, threshold):
+    """Yield the planned move of every image that looks like an earlier one (re-saved, resized, re-compressed).
 
-                # Check if it's a media file
-                file_ext = os.path.splitext(file)[1].lower()
-                if file_ext not in media_extensions:
+    The largest file of a group (usually the original, least compressed one) is kept in place and
+    the others go to Near_Duplicates/<keeper name>/ next to where Duplicates would go, so the
+    group can be reviewed together. Entries carry the keeper, the
+    Hamming distance and both perceptual hashes.
+    """
+    for media_files, review_folder_for in iter_duplicate_scan_sets(source_dir, scope, get_rules().image_extensions):
+        sizes = dict(media_files)
+        media_files = sorted(media_files, key=lambda item: -item[1])
+        groups, hashes = find_near_duplicate_groups(media_files, threshold)
+        for keeper, members in groups:
+            for file_path, distance in members:
+                try:
+                    mtime_ns = os.stat(file_path).st_mtime_ns
+                except OSError:
+                    logger.warning(f"Warning: Could not access {file_path}")
                     continue
+                group_folder = os.path.join(review_folder_for(file_path, "Near_Duplicates"),
+                                            os.path.splitext(os.path.basename(keeper))[0])
+                yield {"src": file_path, "dest": os.path.join(group_folder, os.path.basename(file_path)),
+                       "reason": "near_duplicate", "size": sizes[file_path], "mtime_ns": mtime_ns,
+                       "keeper": keeper, "distance": distance,
+                       "phash": f"{hashes[file_path]:016x}", "keeper_phash": f"{hashes[keeper]:016x}"}
 
-                # Generate hash and detect duplicates
-                file_hash = get_file_hash(file_path)
-                if file_hash in file_hashes:
-                    duplicate_path = os.path.join(duplicates_folder, file)
-                    
-                    # Avoid overwriting duplicates
-                    counter = 1
-                    while os.path.exists(duplicate_path):
-                        base, ext = os.path.splitext(file)
-                        duplicate_path = os.path.join(duplicates_folder, f"{base}_{counter}{ext}")
-                        counter += 1
-
-                    if dry_run:
-                        logger.info(f"[DRY RUN] Would move duplicate: {file_path} → {duplicate_path}")
-                    else:
-                        safe_move_file(file_path, duplicate_path)
-                        logger.info(f"Moved duplicate: {file_path} → {duplicate_path}")
-                else:
-                    file_hashes[file_hash] = file_path 
+@operation_wrapper
+@with_dry_run(default=False)
+def move_media_duplicates(source_dir, dry_run, scope=None):
+    """Move duplicate media files (images/videos) into Duplicates folders (journaled, see undo_moves).
+
+    scope is "month", "library" or "source" (see plan_duplicate_moves) and defaults to the
+    duplicate_scope setting. A dry run writes the plan to a file instead (returned), so apply_plan
+    can move the duplicates later without hashing anything again.
+    """
+    scope = scope or config.get("duplicate_scope") or "month"
+    if dry_run:
+        return write_plan("move_media_duplicates", source_dir, plan_duplicate_moves(source_dir, scope))
+
+    return run_journaled_moves("move_media_duplicates", source_dir, lambda: plan_duplicate_moves(source_dir, scope))
 
 @operation_wrapper
 @with_dry_run(default=False)
-def delete_duplicates_folders(source_dir, dry_run):
-    """Delete 'Duplicates' folders under Sorted_Media, including all contents."""
+def move_new_duplicates(source_dir, dry_run, new_files, scope=None):
+    """Move duplicates of just-organized files into Duplicates folders (journaled, see plan_new_duplicate_moves)."""
+    scope = scope or config.get("duplicate_scope") or "month"
+    build_plan = lambda: plan_new_duplicate_moves(source_dir, new_files, scope)
+    if dry_run:
+        return write_plan("move_new_duplicates", source_dir, build_plan())
+
+    return run_journaled_moves("move_new_duplicates", source_dir, build_plan)
+
+@operation_wrapper
+@with_dry_run(default=False)
+def move_near_duplicates(source_dir, dry_run, scope=None, threshold=None):
+    """Move visually similar images into Near_Duplicates review folders (journaled, see undo_moves).
+
+    Images are compared by a 64-bit difference hash; threshold is the largest Hamming distance
+    still treated as the same picture and defaults to the phash_threshold setting. A dry run
+    writes the plan to a file instead (returned).
+    """
+    scope = scope or config.get("duplicate_scope") or "month"
+    threshold = threshold if threshold is not None else int(config.get("phash_threshold") or 0)
+    build_plan = lambda: plan_near_duplicate_moves(source_dir, scope, threshold)
+    if dry_run:
+        return write_plan("move_near_duplicates", source_dir, build_plan())
+
+    return run_journaled_moves("move_near_duplicates", source_dir, build_plan)
+
+@operation_wrapper
+@with_dry_run(default=False)
+def link_media_duplicates(source_dir, dry_run, mode=None, scope=None):
+    """Replace duplicate media files with hardlinks or reflinks to their keeper, so every path keeps working.
+
+    mode is "hardlink", "reflink" or "auto" (reflink where the file system supports it, hardlink
+    otherwise) and defaults to the duplicate_link_mode setting. Contents are compared byte for
+    byte before a file is replaced. Returns the number of bytes reclaimed.
+    """
+    mode = mode or config.get("duplicate_link_mode") or "hardlink"
+    scope = scope or config.get("duplicate_scope") or "month"
+    linked = already_linked = reclaimed = 0
+
+    for entry in plan_duplicate_moves(source_dir, scope):
+        progress.advance()
+        duplicate, keeper = entry["src"], entry["keeper"]
+        try:
+            duplicate_stat = os.stat(duplicate)
+            if os.path.samestat(duplicate_stat, os.stat(keeper)):
+                already_linked += 1
+                continue
+        except OSError as e:
+            logger.warning(f"Warning: Could not access {duplicate}: {e}")
+            continue
+
+        # Space is only freed when no other hardlink keeps the duplicate's data alive
+        freed = duplicate_stat.st_size if duplicate_stat.st_nlink == 1 else 0
+        if dry_run:
+            logger.event("would_link", f"[DRY RUN] Would replace with a link ({mode}): {duplicate} → {keeper}",
+                         src=duplicate, keeper=keeper)
+            linked += 1
+            reclaimed += freed
+            continue
+
+        try:
+            used = replace_with_link(keeper, duplicate, mode)
+        except (LinkNotSupportedError, ValueError, OSError) as e:
+            logger.warning(f"Warning: Could not link {duplicate}: {e}")
+            continue
+        linked += 1
+        reclaimed += freed
+        logger.event("linked", f"Replaced duplicate with a {used}: {duplicate} → {keeper}", src=duplicate, keeper=keeper, mode=used)
+
+    prefix = "[DRY RUN] Would reclaim" if dry_run else "Reclaimed"
+    logger.info(f"{prefix} {bytes_to_mb(reclaimed):.2f} MB by linking {linked} duplicates ({already_linked} already linked).")
+    return reclaimed
+
+@operation_wrapper
+@with_dry_run(default=False)
+def delete_duplicates_folders(source_dir, dry_run, scope=None):
+    """Delete the 'Duplicates' folders duplicate runs created, including all contents.
+
+    These are the ones in each Sorted_Media year/month folder, plus Sorted_Media/Unsorted/Duplicates
+    for the "library" scope and <source>/Duplicates for the "source" scope (see plan_duplicate_moves).
+    scope defaults to the duplicate_scope setting; excluded folders are left alone.
+    """
+    scope = scope or config.get("duplicate_scope") or "month"
     sorted_media_dir = os.path.join(source_dir, "Sorted_Media")
     excluded_folders = config.get("excluded_folders")
 
     ensure_directory_exists(sorted_media_dir)
 
+    duplicates_folders = []
     # Walk through each year and month folder in Sorted_Media
     for year in os.listdir(sorted_media_dir):
         year_path = os.path.join(sorted_media_dir, year)
@@ -196,11 +501,20 @@ def delete_duplicates_folders(source_dir, dry_run):
             month_path = os.path.join(year_path, month)
             if not os.path.isdir(month_path) or is_excluded_path(month_path, excluded_folders):
                 continue
+            duplicates_folders.append(os.path.join(month_path, "Duplicates"))
+
+    if scope == "library":
+        duplicates_folders.append(os.path.join(sorted_media_dir, "Unsorted", "Duplicates"))
+    elif scope == "source":
+        # The review folder names are excluded by default so scans skip them; other exclusions still apply
+        source_duplicates = os.path.join(source_dir, "Duplicates")
+        if not is_excluded_path(source_duplicates, [folder for folder in excluded_folders if folder not in REVIEW_FOLDERS]):
+            duplicates_folders.append(source_duplicates)
 
-            duplicates_folder = os.path.join(month_path, "Duplicates")
-            if os.path.exists(duplicates_folder):
-                if dry_run:
-                    logger.info(f"[DRY RUN] Would delete folder: {duplicates_folder}")
-                else:
-                    shutil.rmtree(duplicates_folder)
-                    logger.info(f"Deleted folder: {duplicates_folder}")
\ No newline at end of file
+    for duplicates_folder in duplicates_folders:
+        if os.path.isdir(duplicates_folder):
+            if dry_run:
+                logger.info(f"[DRY RUN] Would delete folder: {duplicates_folder}")
+            else:
+                shutil.rmtree(duplicates_folder)
+                logger.info(f"Deleted folder: {duplicates_folder}")
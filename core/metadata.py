@@ -0,0 +1,274 @@
+import io
+import os
+import struct
+from datetime import datetime, timedelta
+
+# Containers the header readers understand; anything else goes to ffprobe
+MP4_EXTENSIONS = {".mp4", ".m4v", ".mov", ".qt", ".3gp", ".3g2", ".m4a"}
+MATROSKA_EXTENSIONS = {".mkv", ".webm", ".mka"}
+
+# Top-level atoms that can start a QuickTime/ISO BMFF file
+MP4_FIRST_ATOMS = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot", b"junk"}
+
+# Images whose Exif lives in a JPEG APP1 segment, or that are TIFF files themselves (incl. common RAW formats).
+# THM files are the JPEG thumbnails some cameras write next to their videos.
+JPEG_EXTENSIONS = {".jpg", ".jpeg", ".jpe", ".jfif", ".thm"}
+TIFF_EXTENSIONS = {".tif", ".tiff", ".dng", ".nef", ".nrw", ".cr2", ".arw", ".srw", ".pef", ".orf", ".rw2"}
+
+# TIFF magic numbers, including the Olympus (ORF) and Panasonic (RW2) variants
+TIFF_MAGIC_NUMBERS = {42, 0x4F52, 0x5352, 0x55}
+EXIF_IFD_POINTER = 0x8769
+DATE_TIME_ORIGINAL = 0x9003  # 36867
+MAX_IFD_ENTRIES = 1024
+
+MP4_EPOCH_OFFSET = 2082844800  # Seconds between 1904-01-01 and 1970-01-01
+MATROSKA_EPOCH = datetime(2001, 1, 1)
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+class UnsupportedContainerError(Exception):
+    """Raised when a header reader cannot answer for a file, so the caller should use ffprobe."""
+    pass
+
+class UnsupportedImageError(Exception):
+    """Raised when the Exif header reader cannot answer for a file, so the caller should use Pillow."""
+    pass
+
+
+def _iter_atoms(f, start, end):
+    """Yield (type, data_start, atom_end) for the atoms between start and end, reading only their headers."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset  # Atom runs to the end of its parent
+        if size < header_size:
+            raise UnsupportedContainerError(f"Invalid atom size at offset {offset}")
+        yield kind, offset + header_size, offset + size
+        offset += size
+
+def read_mp4_creation_time(file_path):
+    """Read the movie header (mvhd) creation time of an MP4/MOV/3GP file.
+
+    Mirrors ffmpeg's handling: a zero time means no date, and times stored relative to
+    1904 are shifted to the Unix epoch. Returns a naive UTC datetime or None.
+    """
+    with open(file_path, "rb") as f:
+        end = os.fstat(f.fileno()).st_size
+        first = f.read(8)
+        if len(first) < 8 or first[4:8] not in MP4_FIRST_ATOMS:
+            raise UnsupportedContainerError("Not an ISO base media file")
+
+        for kind, data_start, atom_end in _iter_atoms(f, 0, end):
+            if kind != b"moov":
+                continue
+            for child, child_start, _ in _iter_atoms(f, data_start, atom_end):
+                if child != b"mvhd":
+                    continue
+                f.seek(child_start)
+                version = f.read(4)[0]
+                if version == 1:
+                    creation_time = struct.unpack(">Q", f.read(8))[0]
+                else:
+                    creation_time = struct.unpack(">I", f.read(4))[0]
+                if not creation_time:
+                    return None
+                if creation_time >= MP4_EPOCH_OFFSET:
+                    creation_time -= MP4_EPOCH_OFFSET
+                return UNIX_EPOCH + timedelta(seconds=creation_time)
+            break
+
+    # A missing or compressed movie header is left to ffprobe
+    raise UnsupportedContainerError("No readable mvhd atom")
+
+
+def _read_vint(f, keep_marker):
+    """Read an EBML variable-length integer; returns (value, length) or (None, length) for an unknown size."""
+    first = f.read(1)
+    if not first:
+        raise UnsupportedContainerError("Unexpected end of file")
+    first = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise UnsupportedContainerError("Invalid EBML integer")
+
+    value = first if keep_marker else first & (mask - 1)
+    rest = f.read(length - 1)
+    if len(rest) < length - 1:
+        raise UnsupportedContainerError("Unexpected end of file")
+    for byte in rest:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        return None, length
+    return value, length
+
+def _iter_elements(f, start, end):
+    """Yield (id, data_start, element_end) for the EBML elements between start and end."""
+    offset = start
+    while offset < end:
+        f.seek(offset)
+        element_id, id_length = _read_vint(f, keep_marker=True)
+        size, size_length = _read_vint(f, keep_marker=False)
+        data_start = offset + id_length + size_length
+        element_end = end if size is None else data_start + size
+        yield element_id, data_start, element_end
+        offset = element_end
+
+def read_matroska_creation_time(file_path):
+    """Read the Segment Info DateUTC of an MKV/WebM file as ffmpeg reports it (microsecond precision)."""
+    with open(file_path, "rb") as f:
+        end = os.fstat(f.fileno()).st_size
+        if f.read(4) != b"\x1a\x45\xdf\xa3":
+            raise UnsupportedContainerError("Not an EBML file")
+
+        for element_id, data_start, element_end in _iter_elements(f, 0, end):
+            if element_id != 0x18538067:  # Segment
+                continue
+            for child_id, child_start, child_end in _iter_elements(f, data_start, element_end):
+                if child_id == 0x1F43B675:  # Cluster: Info normally precedes the media data
+                    break
+                if child_id != 0x1549A966:  # Info
+                    continue
+                for info_id, info_start, info_end in _iter_elements(f, child_start, child_end):
+                    if info_id == 0x4461 and info_end - info_start == 8:  # DateUTC
+                        f.seek(info_start)
+                        nanoseconds = struct.unpack(">q", f.read(8))[0]
+                        # ffmpeg truncates to microseconds with C integer division
+                        microseconds = abs(nanoseconds) // 1000 * (1 if nanoseconds >= 0 else -1)
+                        return MATROSKA_EPOCH + timedelta(microseconds=microseconds)
+                return None
+            break
+
+    raise UnsupportedContainerError("No Segment Info found in the file header")
+
+
+def read_container_creation_time(file_path):
+    """Read a video's container creation time from its header bytes, without spawning ffprobe.
+
+    Returns a naive UTC datetime, or None when the container carries no creation time.
+    Raises UnsupportedContainerError for formats (or damaged files) the readers cannot handle.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if ext in MP4_EXTENSIONS:
+            return read_mp4_creation_time(file_path)
+        if ext in MATROSKA_EXTENSIONS:
+            return read_matroska_creation_time(file_path)
+    except (OSError, struct.error, IndexError, OverflowError) as e:
+        raise UnsupportedContainerError(f"Could not read {file_path}: {e}")
+    raise UnsupportedContainerError(f"No header reader for {ext} files")
+
+
+def _read_ifd(f, base, offset, order):
+    """Return {tag: (type, count, raw 4-byte value)} for the TIFF IFD at offset."""
+    f.seek(base + offset)
+    raw_count = f.read(2)
+    if len(raw_count) < 2:
+        raise UnsupportedImageError("Truncated IFD")
+    count = struct.unpack(order + "H", raw_count)[0]
+    if count > MAX_IFD_ENTRIES:
+        raise UnsupportedImageError("Implausible IFD entry count")
+
+    data = f.read(12 * count)
+    if len(data) < 12 * count:
+        raise UnsupportedImageError("Truncated IFD")
+    entries = {}
+    for i in range(count):
+        tag, value_type, value_count = struct.unpack(order + "HHI", data[12 * i:12 * i + 8])
+        entries[tag] = (value_type, value_count, data[12 * i + 8:12 * i + 12])
+    return entries
+
+def _read_ascii_date(f, base, order, entry):
+    """Decode a DateTimeOriginal entry the way Pillow does; None if it is not a valid date."""
+    value_type, count, raw = entry
+    if value_type != 2:
+        raise UnsupportedImageError("DateTimeOriginal is not stored as ASCII")
+    if count <= 4:
+        data = raw[:count]
+    else:
+        f.seek(base + struct.unpack(order + "I", raw)[0])
+        data = f.read(count)
+    if data.endswith(b"\0"):
+        data = data[:-1]
+    try:
+        return datetime.strptime(data.decode("latin-1", "replace"), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+
+def _read_tiff_date(f, base=0):
+    """Find DateTimeOriginal in a TIFF structure starting at base; the Exif IFD wins over IFD0 like in Pillow."""
+    f.seek(base)
+    header = f.read(8)
+    if len(header) < 8 or header[:2] not in (b"II", b"MM"):
+        raise UnsupportedImageError("Not a TIFF header")
+    order = "<" if header[:2] == b"II" else ">"
+    magic, ifd0_offset = struct.unpack(order + "HI", header[2:8])
+    if magic not in TIFF_MAGIC_NUMBERS:
+        raise UnsupportedImageError("Unknown TIFF variant")
+
+    ifd0 = _read_ifd(f, base, ifd0_offset, order)
+    if EXIF_IFD_POINTER in ifd0:
+        exif_offset = struct.unpack(order + "I", ifd0[EXIF_IFD_POINTER][2])[0]
+        exif_ifd = _read_ifd(f, base, exif_offset, order)
+        if DATE_TIME_ORIGINAL in exif_ifd:
+            return _read_ascii_date(f, base, order, exif_ifd[DATE_TIME_ORIGINAL])
+    if DATE_TIME_ORIGINAL in ifd0:
+        return _read_ascii_date(f, base, order, ifd0[DATE_TIME_ORIGINAL])
+    return None
+
+def _read_jpeg_exif_block(f):
+    """Return the Exif payload of a JPEG (APP1 segments joined like Pillow does), or None if it has none."""
+    if f.read(2) != b"\xff\xd8":
+        raise UnsupportedImageError("Not a JPEG file")
+
+    exif = None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            raise UnsupportedImageError("Corrupt JPEG marker")
+        code = marker[1]
+        while code == 0xFF:  # Fill bytes
+            code = f.read(1)[0]
+        if code in (0xD9, 0xDA):  # End of image / start of scan: no more metadata segments
+            return exif
+        if code == 0x01 or 0xD0 <= code <= 0xD7:  # Markers without a length
+            continue
+
+        length = struct.unpack(">H", f.read(2))[0]
+        if length < 2:
+            raise UnsupportedImageError("Corrupt JPEG segment length")
+        if code == 0xE1:
+            segment = f.read(length - 2)
+            if segment.startswith(b"Exif\0\0"):
+                exif = segment[6:] if exif is None else exif + segment[6:]
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+def read_exif_date_original(file_path):
+    """Read Exif DateTimeOriginal (tag 36867) from the header bytes of a JPEG or TIFF-based image.
+
+    Returns a datetime, or None when the image has no valid DateTimeOriginal.
+    Raises UnsupportedImageError for formats (or damaged files) the reader cannot handle.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        with open(file_path, "rb") as f:
+            if ext in JPEG_EXTENSIONS:
+                exif = _read_jpeg_exif_block(f)
+                return _read_tiff_date(io.BytesIO(exif)) if exif else None
+            if ext in TIFF_EXTENSIONS:
+                return _read_tiff_date(f)
+    except (OSError, struct.error, IndexError) as e:
+        raise UnsupportedImageError(f"Could not read {file_path}: {e}")
+    raise UnsupportedImageError(f"No Exif header reader for {ext} files")
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import heapq
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+from services.services import config, logger, METRICS_DIR
+
+PROMETHEUS_PREFIX = "purespace"
+
+class OperationMetrics:
+    """Timings and counters of one operation run.
+
+    Wall time, files and bytes are split by phase (the names passed to progress.phase, e.g.
+    "Listing files", "Reading dates", "Hashing", "Moving"); work before the first phase is
+    reported as "other". The slowest single files are kept in a bounded heap.
+    """
+
+    def __init__(self, operation, slowest_files=10):
+        self.operation = operation
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.phase_name = "other"
+        self.phase_started = self.started
+        self.phase_files = Counter()
+        self.phase_bytes = Counter()
+        self.counters = Counter()
+        self.slowest_limit = slowest_files
+        self.slowest = []  # min-heap of (seconds, path, phase)
+
+    def enter_phase(self, name):
+        now = time.perf_counter()
+        self.phases[self.phase_name] = self.phases.get(self.phase_name, 0.0) + now - self.phase_started
+        self.phase_name = name
+        self.phase_started = now
+
+    def record_file(self, path, seconds):
+        if self.slowest_limit <= 0:
+            return
+        item = (seconds, path, self.phase_name)
+        if len(self.slowest) < self.slowest_limit:
+            heapq.heappush(self.slowest, item)
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, item)
+
+    def report(self, events=None):
+        self.enter_phase(self.phase_name)
+        return {
+            "operation": self.operation,
+            "started": self.started_at.isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - self.started, 4),
+            "phases": {name: {"seconds": round(seconds, 4), "files": self.phase_files[name], "bytes": self.phase_bytes[name]}
+                       for name, seconds in self.phases.items() if seconds >= 0.0005 or self.phase_files[name]},
+            "counters": dict(self.counters),
+            "slowest_files": [{"path": path, "seconds": round(seconds, 4), "phase": phase}
+                              for seconds, path, phase in sorted(self.slowest, reverse=True)],
+            "events": events or {},
+        }
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread every interval and counts collapsed stacks.
+
+    The result is written in the "folded" format read by flamegraph.pl and speedscope.
+    Costs one frame walk per interval, so it can stay on during long runs.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Metrics:
+    """Collects OperationMetrics for the operations running on each thread.
+
+    operation_wrapper starts and finishes a run; the core modules report through phase(),
+    count() and record_file(). Nested operations (e.g. the steps of run_pipeline) are
+    measured on their own and also count towards the operation around them.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def start(self, operation):
+        stack = self._stack()
+        run = OperationMetrics(operation, int(config.get("metrics_slowest_files") or 0))
+        run.profiler = self._start_profiler() if not stack else None
+        stack.append(run)
+
+    def finish(self, events=None):
+        """End the innermost operation of this thread: log its phase breakdown, export it and return the report."""
+        run = self._stack().pop()
+        report = run.report(events)
+        self._local.last = report
+
+        stamp = run.started_at.strftime("%Y%m%d_%H%M%S_%f")
+        if run.profiler is not None:
+            self._stop_profiler(run.profiler, os.path.join(METRICS_DIR, f"{run.operation}_{stamp}"))
+        phases = ", ".join(f"{name} {phase['seconds']:.2f}s" for name, phase in report["phases"].items())
+        counters = ", ".join(f"{name}={value}" for name, value in sorted(report["counters"].items()))
+        logger.info(f"{run.operation} took {report['seconds']:.2f}s ({phases})" + (f"; {counters}" if counters else ""))
+
+        try:
+            if config.get("metrics_json"):
+                os.makedirs(METRICS_DIR, exist_ok=True)
+                with open(os.path.join(METRICS_DIR, f"{run.operation}_{stamp}.json"), "w") as f:
+                    json.dump(report, f, indent=2)
+            textfile_dir = config.get("metrics_textfile_dir")
+            if textfile_dir:
+                write_prometheus_textfile(report, textfile_dir)
+        except OSError as e:
+            logger.warning(f"Warning: Could not export metrics of {run.operation}: {e}")
+        return report
+
+    def last_report(self):
+        """Report of the last operation that finished on the current thread."""
+        return getattr(self._local, "last", None)
+
+    def phase(self, name):
+        for run in self._stack():
+            run.enter_phase(name)
+
+    def advance(self, files, nbytes):
+        """Count files and bytes finished in the current phase."""
+        for run in self._stack():
+            run.phase_files[run.phase_name] += files
+            run.phase_bytes[run.phase_name] += nbytes
+
+    def count(self, name, n=1):
+        for run in self._stack():
+            run.counters[name] += n
+
+    def record_file(self, path, seconds):
+        """Note how long a single file took in the current phase (keeps the slowest ones)."""
+        for run in self._stack():
+            run.record_file(path, seconds)
+
+    def _start_profiler(self):
+        mode = config.get("profiler")
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:  # Another operation is already being profiled
+                logger.warning(f"Warning: Profiler not started: {e}")
+                return None
+            return profiler
+        if mode == "sampling":
+            interval = float(config.get("profiler_interval_ms") or 5) / 1000
+            profiler = SamplingProfiler(threading.get_ident(), interval)
+            profiler.start()
+            return profiler
+        return None
+
+    def _stop_profiler(self, profiler, base_path):
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = base_path + ".prof"
+            profiler.dump_stats(path)
+        else:
+            profiler.stop()
+            path = base_path + ".folded"
+            profiler.write(path)
+        logger.info(f"Profile written to {path}")
+
+
+def timed(func, *args):
+    """Call func(*args) and return (result, seconds); for work on pool threads, recorded by the caller."""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+def format_prometheus(report):
+    """Render one operation report in the Prometheus text exposition format."""
+    labels = f'operation="{report["operation"]}"'
+    lines = [
+        f"# HELP {PROMETHEUS_PREFIX}_operation_seconds Wall time of the last run of the operation.",
+        f"# TYPE {PROMETHEUS_PREFIX}_operation_seconds gauge",
+        f"{PROMETHEUS_PREFIX}_operation_seconds{{{labels}}} {report['seconds']}",
+        f"# HELP {PROMETHEUS_PREFIX}_operation_last_run_timestamp_seconds When the last run started.",
+        f"# TYPE {PROMETHEUS_PREFIX}_operation_last_run_timestamp_seconds gauge",
+        f"{PROMETHEUS_PREFIX}_operation_last_run_timestamp_seconds{{{labels}}} "
+        f"{datetime.fromisoformat(report['started']).timestamp():.0f}",
+    ]
+    for field, text in [("seconds", "Wall time"), ("files", "Files finished"), ("bytes", "Bytes processed")]:
+        lines += [f"# HELP {PROMETHEUS_PREFIX}_phase_{field} {text} per phase of the last run.",
+                  f"# TYPE {PROMETHEUS_PREFIX}_phase_{field} gauge"]
+        lines += [f'{PROMETHEUS_PREFIX}_phase_{field}{{{labels},phase="{name}"}} {phase[field]}'
+                  for name, phase in report["phases"].items()]
+    # Counts of the last run only (they restart at every run), so gauges without the counter "_total" suffix
+    for name, value in sorted(report["counters"].items()):
+        lines += [f"# HELP {PROMETHEUS_PREFIX}_run_{name} Count of {name} in the last run.",
+                  f"# TYPE {PROMETHEUS_PREFIX}_run_{name} gauge", f"{PROMETHEUS_PREFIX}_run_{name}{{{labels}}} {value}"]
+    lines += [f"# HELP {PROMETHEUS_PREFIX}_run_events Logged events per kind in the last run.",
+              f"# TYPE {PROMETHEUS_PREFIX}_run_events gauge"]
+    lines += [f'{PROMETHEUS_PREFIX}_run_events{{{labels},kind="{kind}"}} {count}'
+              for kind, count in sorted(report["events"].items())]
+    return "\n".join(lines) + "\n"
+
+def write_prometheus_textfile(report, textfile_dir):
+    """Write <textfile_dir>/purespace_<operation>.prom for node_exporter's textfile collector.
+
+    The file is written next to its final name and renamed, so a scrape never reads half of it.
+    """
+    os.makedirs(textfile_dir, exist_ok=True)
+    path = os.path.join(textfile_dir, f"{PROMETHEUS_PREFIX}_{report['operation']}.prom")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(format_prometheus(report))
+    os.replace(temp_path, path)
+
+
+# Singleton Instance (Shared by every operation in a run)
+metrics = Metrics()
@@ -0,0 +1,162 @@
+import os
+import errno
+import shutil
+from core.helpers import FileMoveError, bytes_to_mb
+from core.scan_index import scan_index
+from services.services import logger
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+class NameReservations:
+    """Unique file names per destination directory, tracked in memory.
+
+    Each directory is listed once, the first time a name is reserved in it. Collisions get the
+    usual "_1", "_2", ... suffixes, but the next free counter is remembered per
+    name, so thousands of IMG_0001.JPG files do not probe the disk for every earlier suffix.
+    """
+
+    def __init__(self):
+        self._taken = {}     # directory -> set of normcased names in use
+        self._counters = {}  # (directory, normcased name) -> next suffix to try
+
+    def _names_in(self, directory):
+        names = self._taken.get(directory)
+        if names is None:
+            try:
+                names = {os.path.normcase(name) for name in os.listdir(directory)}
+            except FileNotFoundError:
+                names = set()
+            self._taken[directory] = names
+        return names
+
+    def reserve(self, path):
+        """Return path, or the first free "<name>_<n><ext>" variant of it, and mark it as taken."""
+        directory, file = os.path.split(path)
+        names = self._names_in(directory)
+        key = os.path.normcase(file)
+        if key not in names:
+            names.add(key)
+            return path
+
+        base, ext = os.path.splitext(file)
+        counter = self._counters.get((directory, key), 1)
+        while True:
+            candidate = f"{base}_{counter}{ext}"
+            counter += 1
+            if os.path.normcase(candidate) not in names:
+                break
+        self._counters[(directory, key)] = counter
+        names.add(os.path.normcase(candidate))
+        return os.path.join(directory, candidate)
+
+    def release(self, path):
+        """Give a name back, e.g. after the file was moved out of its directory."""
+        directory, file = os.path.split(path)
+        if directory in self._taken:
+            self._taken[directory].discard(os.path.normcase(file))
+
+
+def copy_file_contents(src, dest):
+    """Copy the bytes of src into a new file dest inside the kernel where possible; returns the bytes copied.
+
+    Uses copy_file_range (Linux, can share extents on reflink file systems), then sendfile, and
+    falls back to a buffered copy elsewhere.
+    """
+    with open(src, "rb") as f_in, open(dest, "xb") as f_out:
+        size = os.fstat(f_in.fileno()).st_size
+        copied = 0
+        for kernel_copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+            if kernel_copy is None:
+                continue
+            try:
+                f_out.seek(copied)
+                while copied < size:
+                    if kernel_copy is os.sendfile:
+                        sent = os.sendfile(f_out.fileno(), f_in.fileno(), copied, min(COPY_CHUNK_SIZE, size - copied))
+                    else:
+                        sent = kernel_copy(f_in.fileno(), f_out.fileno(), min(COPY_CHUNK_SIZE, size - copied), copied, copied)
+                    if sent == 0:
+                        break
+                    copied += sent
+                if copied >= size:
+                    return copied
+            except OSError as e:
+                # Not supported between these file systems: let the next method take over
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF):
+                    raise
+
+        f_in.seek(copied)
+        f_out.seek(copied)
+        while chunk := f_in.read(COPY_CHUNK_SIZE):
+            f_out.write(chunk)
+            copied += len(chunk)
+        return copied
+
+
+class FileMover:
+    """Moves files for one run without overwriting anything.
+
+    Destination names are reserved through NameReservations; a single lstat guards each
+    rename against files that appeared since the directory was listed. Moves on the same
+    device are a plain rename, moves across devices copy the contents (see copy_file_contents),
+    keep the timestamps and permissions, then delete the source.
+    """
+
+    def __init__(self):
+        self.names = NameReservations()
+        self.created_dirs = set()
+        self.renames = 0
+        self.copies = 0
+        self.copied_bytes = 0
+
+    def move(self, src, dest):
+        """Move src to dest (or a free variant of it) and return the path it ended up at."""
+        dest_dir = os.path.dirname(dest)
+        if dest_dir not in self.created_dirs:
+            os.makedirs(dest_dir, exist_ok=True)
+            self.created_dirs.add(dest_dir)
+
+        wanted = dest
+        dest = self.names.reserve(wanted)
+        while os.path.lexists(dest):
+            # Created by someone else after the directory was listed; reserve() now counts it as taken
+            dest = self.names.reserve(wanted)
+
+        try:
+            try:
+                os.rename(src, dest)
+                self.renames += 1
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                self._copy_and_delete(src, dest)
+        except Exception as e:
+            self.names.release(dest)
+            raise FileMoveError(f"Failed to move {src} to {dest}: {e}")
+
+        self.names.release(src)
+        scan_index.relocate(src, dest)
+        return dest
+
+    def _copy_and_delete(self, src, dest):
+        try:
+            copied = copy_file_contents(src, dest)
+            if copied != os.path.getsize(src):
+                raise OSError(f"copied {copied} bytes of {os.path.getsize(src)}")
+            shutil.copystat(src, dest)
+        except BaseException:
+            if os.path.exists(dest):
+                os.remove(dest)
+            raise
+        os.remove(src)
+        self.copies += 1
+        self.copied_bytes += copied
+
+    def log_stats(self, operation):
+        logger.info(
+            f"{operation}: {self.renames} renames, {self.copies} cross-device copies "
+            f"({bytes_to_mb(self.copied_bytes):.2f} MB copied)."
+        )
+
+    def stats(self):
+        return {"renames": self.renames, "copies": self.copies, "copied_bytes": self.copied_bytes}
@@ -0,0 +1,143 @@
+import os
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+from core.hashing import hash_files
+from core.scan_index import scan_index
+from core.progress import progress
+from core.metrics import metrics
+from services.services import logger
+
+HASH_WIDTH, HASH_HEIGHT = 9, 8  # dHash compares each of 8 rows of 9 pixels with its neighbour: 64 bits
+BATCH_SIZE = 512
+
+def load_thumbnail(file_path):
+    """Decode an image straight to a tiny grayscale thumbnail (JPEGs are downscaled while decoding)."""
+    with Image.open(file_path) as img:
+        img.draft("L", (HASH_WIDTH * 8, HASH_HEIGHT * 8))
+        thumbnail = img.convert("L").resize((HASH_WIDTH, HASH_HEIGHT), Image.BILINEAR)
+        return np.asarray(thumbnail, dtype=np.int16)
+
+def dhash_batch(thumbnails):
+    """Difference hashes of a batch of (8, 9) thumbnails as 64-bit integers, computed in one vectorized pass."""
+    pixels = np.stack(thumbnails)
+    bits = (pixels[:, :, 1:] > pixels[:, :, :-1]).reshape(len(thumbnails), -1)
+    return [int(value) for value in np.packbits(bits, axis=1).view(">u8").ravel()]
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+def compute_perceptual_hashes(files):
+    """Return {path: dHash} for a list of (path, size) image files.
+
+    Hashes are reused from the scan index; the rest are decoded to thumbnails on the hashing
+    thread pool and hashed in NumPy batches. Files Pillow cannot open are skipped.
+    """
+    hashes = {}
+    stats = {}
+    pending = []
+    metrics.count("stats", len(files))
+    for path, size in files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        row = scan_index.lookup(path, st)
+        if row and row["perceptual_hash"]:
+            hashes[path] = int(row["perceptual_hash"], 16)
+        else:
+            stats[path] = st
+            pending.append((path, size))
+
+    batch_paths, batch_thumbnails = [], []
+    progress.phase("Perceptual hashing", total_files=len(pending))
+
+    def flush():
+        for path, value in zip(batch_paths, dhash_batch(batch_thumbnails)):
+            hashes[path] = value
+            scan_index.store(path, stats[path], perceptual_hash=f"{value:016x}")
+        batch_paths.clear()
+        batch_thumbnails.clear()
+
+    for path, thumbnail, error in hash_files(pending, load_thumbnail):
+        if error is not None:
+            if not isinstance(error, (OSError, UnidentifiedImageError, ValueError)):
+                raise error
+            logger.warning(f"Warning: Could not read image {path}: {error}")
+            continue
+        batch_paths.append(path)
+        batch_thumbnails.append(thumbnail)
+        if len(batch_paths) >= BATCH_SIZE:
+            flush()
+    if batch_paths:
+        flush()
+    return hashes
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes with Hamming distance.
+
+    A search for everything within distance t only descends into children whose edge distance
+    lies in [d - t, d + t], so lookups touch a small part of the tree instead of every hash.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, items, {distance: child}]
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, threshold):
+        """Return (item, distance) for every item whose hash is within threshold of value."""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= threshold:
+                results.extend((item, distance) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - threshold <= edge <= distance + threshold:
+                    stack.append(child)
+        return results
+
+
+def find_near_duplicate_groups(files, threshold):
+    """Group visually similar images from a list of (path, size) pairs.
+
+    Each group starts at the first not yet grouped image (in input order), which is the one to
+    keep, and holds every other ungrouped image within threshold bits of it. Returns a list of
+    (keeper, [(path, distance), ...]) plus the hashes that were used.
+    """
+    hashes = compute_perceptual_hashes(files)
+    order = [path for path, _ in files if path in hashes]
+
+    tree = BKTree()
+    for index, path in enumerate(order):
+        tree.add(hashes[path], index)
+
+    grouped = set()
+    groups = []
+    for index, path in enumerate(order):
+        if index in grouped:
+            continue
+        members = sorted((other, distance) for other, distance in tree.search(hashes[path], threshold)
+                         if other != index and other not in grouped)
+        if not members:
+            continue
+        grouped.add(index)
+        grouped.update(other for other, _ in members)
+        groups.append((path, [(order[other], distance) for other, distance in members]))
+    return groups, hashes
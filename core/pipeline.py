@@ -0,0 +1,72 @@
+import time
+from core.wrappers import operation_wrapper, with_dry_run
+from core.inventory import build_inventory
+from core.progress import OperationCancelled
+from core.metrics import metrics
+from core.cleaner import delete_empty_files, delete_empty_folders, find_large_files, move_unwanted_files
+from core.media_organizer import (organize_media_by_date, move_media_duplicates, link_media_duplicates,
+                                  move_near_duplicates, delete_duplicates_folders)
+from services.services import config, logger
+
+# Steps a pipeline can chain, in the order they are usually run.
+# Steps that take an inventory share the single listing of the source directory.
+PIPELINE_STEPS = {
+    "unwanted": (move_unwanted_files, True),
+    "empty-files": (delete_empty_files, True),
+    "organize": (organize_media_by_date, True),
+    "empty-folders": (delete_empty_folders, True),
+    "large-files": (find_large_files, True),
+    "duplicates": (move_media_duplicates, False),
+    "near-duplicates": (move_near_duplicates, False),
+    "link-duplicates": (link_media_duplicates, False),
+    "delete-duplicates": (delete_duplicates_folders, False),
+}
+
+@operation_wrapper
+@with_dry_run(default=False)
+def run_pipeline(source_dir, dry_run, steps, merge_media=True):
+    """Run several operations in one pass over the source directory.
+
+    The tree is listed once into an inventory that every file-level step (unwanted files,
+    empty files/folders, organizing, large files) works on and keeps up to date, so e.g. folders
+    emptied by organizing are deleted without walking the tree again. Duplicate steps work on
+    Sorted_Media and run as usual. Returns one summary dict per step; a failing step stops the
+    pipeline and is reported with its error; cancelling stops it at the next file boundary.
+    """
+    unknown = [name for name in steps if name not in PIPELINE_STEPS]
+    if unknown:
+        raise ValueError(f"Unknown pipeline steps: {unknown}")
+
+    inventory = None
+    summaries = []
+    for name in steps:
+        operation, uses_inventory = PIPELINE_STEPS[name]
+        kwargs = {}
+        if uses_inventory:
+            if inventory is None:
+                inventory = build_inventory(source_dir, config.get("excluded_folders"))
+                logger.info(f"Inventory: {len(inventory.files)} files in {len(inventory.dir_entries)} folders.")
+            kwargs["inventory"] = inventory
+        if operation is not find_large_files:
+            kwargs["dry_run"] = dry_run
+        if operation is organize_media_by_date:
+            kwargs["merge_media"] = merge_media
+
+        started = time.perf_counter()
+        summary = {"step": name, "status": "ok"}
+        try:
+            summary["result"] = operation(**kwargs)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            summary.update(status="error", error=str(e))
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        summary["events"] = logger.last_summary()
+        report = metrics.last_report() or {}
+        summary["phases"] = report.get("phases", {})
+        summary["counters"] = report.get("counters", {})
+        summaries.append(summary)
+        if summary["status"] != "ok":
+            break
+
+    return summaries
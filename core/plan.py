@@ -0,0 +1,119 @@
+import os
+import json
+from datetime import datetime
+from core.helpers import ensure_directory_exists
+from core.journal import MoveJournal, run_journaled_moves, read_records, describe_move
+from core.wrappers import operation_wrapper, with_dry_run
+from services.services import logger, PLAN_DIR
+
+def write_plan(operation, source_dir, entries):
+    """Write the planned moves of a dry run to a reviewable JSON-lines file and return its path.
+
+    Each entry keeps src, dest, reason and its evidence (dates, hashes, keeper), plus the size and
+    mtime of the source so apply_plan can cheaply confirm the file has not changed since.
+    """
+    ensure_directory_exists(PLAN_DIR)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    plan_path = os.path.join(PLAN_DIR, f"{operation}_{stamp}.plan.jsonl")
+
+    count = 0
+    with open(plan_path, "w", encoding="utf-8") as f:
+        header = {"type": "header", "operation": operation, "source_dir": source_dir,
+                  "created": datetime.now().isoformat(timespec="seconds")}
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for entry in entries:
+            if "size" not in entry or "mtime_ns" not in entry:
+                try:
+                    st = os.stat(entry["src"])
+                except OSError:
+                    logger.warning(f"Warning: Could not stat {entry['src']}, leaving it out of the plan")
+                    continue
+                entry = dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns)
+            f.write(json.dumps(dict(entry, type="move"), ensure_ascii=False) + "\n")
+            logger.event(f"would_move_{entry['reason']}", describe_move(entry, verb="[DRY RUN] Would move"),
+                         src=entry["src"], dest=entry["dest"])
+            count += 1
+
+    logger.info(f"Plan with {count} moves written to {plan_path}")
+    return plan_path
+
+def read_plan(plan_path):
+    """Return (header, move entries) of a plan file."""
+    header, entries = None, []
+    for record in read_records(plan_path):
+        if record.get("type") == "header":
+            header = record
+        elif record.get("type") == "move":
+            entries.append(record)
+    return header, entries
+
+def find_latest_plan(source_dir, operation=None):
+    """Return the newest plan written for source_dir (optionally for one operation), or None."""
+    if not os.path.isdir(PLAN_DIR):
+        return None
+    candidates = sorted(
+        (name for name in os.listdir(PLAN_DIR)
+         if name.endswith(".plan.jsonl") and (operation is None or name.startswith(f"{operation}_"))),
+        key=lambda name: os.path.getmtime(os.path.join(PLAN_DIR, name)),
+        reverse=True
+    )
+    for name in candidates:
+        path = os.path.join(PLAN_DIR, name)
+        header = next(read_records(path), {})
+        if header.get("source_dir") == source_dir:
+            return path
+    return None
+
+def is_unchanged(entry):
+    """Cheap stat check that a planned source still has the size and mtime it had when planned."""
+    try:
+        st = os.stat(entry["src"])
+    except OSError:
+        return False
+    return st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]
+
+@operation_wrapper
+@with_dry_run(default=False)
+def apply_plan(source_dir, dry_run, plan_path=None, reasons=None, keep=None):
+    """Execute a plan written by a dry run without rescanning.
+
+    reasons limits the plan to some kinds of moves (e.g. ["duplicate"]) and keep is an optional
+    callable to filter entries further. Sources whose size or mtime changed since the dry run
+    are skipped. Returns the journal of the run, so it can be undone like any other.
+    A plan is refused while an interrupted run of its operation over the folder is unfinished,
+    since the plan was made without knowing which of that run's moves are still to come.
+    """
+    plan_path = plan_path or find_latest_plan(source_dir)
+    if not plan_path:
+        logger.info("No plan to apply for this folder.")
+        return None
+
+    header, entries = read_plan(plan_path)
+    if not header or header.get("source_dir") != source_dir:
+        raise ValueError(f"Plan {plan_path} was made for another folder: {header and header.get('source_dir')}")
+    if not dry_run and MoveJournal(header["operation"], source_dir).is_interrupted():
+        raise ValueError(f"An interrupted {header['operation']} run over this folder is unfinished; "
+                         f"run {header['operation']} again to resume it before applying a plan")
+
+    def verified_entries():
+        for entry in entries:
+            if reasons and entry.get("reason") not in reasons:
+                continue
+            if keep and not keep(entry):
+                continue
+            if not is_unchanged(entry):
+                logger.warning(f"Warning: {entry['src']} changed since the dry run, skipping it")
+                continue
+            yield {key: value for key, value in entry.items() if key not in ("type", "id")}
+
+    logger.info(f"Applying plan {plan_path}")
+    if dry_run:
+        for entry in verified_entries():
+            logger.event(f"would_move_{entry['reason']}", describe_move(entry, verb="[DRY RUN] Would move"),
+                         src=entry["src"], dest=entry["dest"])
+        return plan_path
+
+    journal_path = run_journaled_moves(header["operation"], source_dir, verified_entries)
+    # An applied plan is kept for reference but never picked up as the latest plan again
+    os.replace(plan_path, plan_path.replace(".plan.jsonl", ".applied.jsonl"))
+    return journal_path
@@ -0,0 +1,121 @@
+import time
+import threading
+from core.metrics import metrics
+
+REPORT_INTERVAL_SECONDS = 0.25
+
+class OperationCancelled(Exception):
+    """Raised at the next file boundary after the user asked a running operation to stop."""
+    pass
+
+
+class TaskProgress:
+    """Progress and cancellation state of one running operation.
+
+    Counters are per phase ("Reading dates", "Hashing", "Moving", ...). report(snapshot) is
+    called from the worker thread at most every REPORT_INTERVAL_SECONDS, so it should only
+    hand the snapshot over (e.g. put it on a queue.Queue).
+    """
+
+    def __init__(self, name, report=None):
+        self.name = name
+        self.report = report
+        self.cancel_event = threading.Event()
+        self.started = time.monotonic()
+        self._last_report = 0.0
+        self.phase("Starting")
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def phase(self, name, total_files=None, total_bytes=None):
+        self.phase_name = name
+        self.phase_started = time.monotonic()
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files_done = 0
+        self.bytes_done = 0
+        self._publish(force=True)
+
+    def advance(self, files=1, nbytes=0):
+        if self.cancel_event.is_set():
+            raise OperationCancelled(f"{self.name} was cancelled")
+        self.files_done += files
+        self.bytes_done += nbytes
+        self._publish()
+
+    def snapshot(self):
+        """Rates and ETA of the current phase; the ETA uses bytes when the phase knows its total size."""
+        elapsed = max(time.monotonic() - self.phase_started, 1e-6)
+        files_per_s = self.files_done / elapsed
+        bytes_per_s = self.bytes_done / elapsed
+        eta = None
+        if self.total_bytes and bytes_per_s:
+            eta = max(self.total_bytes - self.bytes_done, 0) / bytes_per_s
+        elif self.total_files and files_per_s:
+            eta = max(self.total_files - self.files_done, 0) / files_per_s
+        return {
+            "task": self.name,
+            "phase": self.phase_name,
+            "files_done": self.files_done,
+            "files_total": self.total_files,
+            "bytes_done": self.bytes_done,
+            "bytes_total": self.total_bytes,
+            "files_per_s": round(files_per_s, 1),
+            "mb_per_s": round(bytes_per_s / (1024 * 1024), 2),
+            "eta_seconds": round(eta) if eta is not None else None,
+            "elapsed_seconds": round(time.monotonic() - self.started),
+        }
+
+    def _publish(self, force=False):
+        now = time.monotonic()
+        if self.report and (force or now - self._last_report >= REPORT_INTERVAL_SECONDS):
+            self._last_report = now
+            self.report(self.snapshot())
+
+
+class Progress:
+    """Entry point the core operations report through, bound per thread to the running TaskProgress.
+
+    Outside of a task (scripts, the CLI) every call is a no-op, so operations never have to
+    check whether anyone is listening. Phases and counts also feed the operation's metrics.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def bind(self, task):
+        self._local.task = task
+
+    def unbind(self):
+        self._local.task = None
+
+    @property
+    def current(self):
+        return getattr(self._local, "task", None)
+
+    def phase(self, name, total_files=None, total_bytes=None):
+        metrics.phase(name)
+        task = self.current
+        if task is not None:
+            task.phase(name, total_files, total_bytes)
+
+    def advance(self, files=1, nbytes=0):
+        """Count finished work; raises OperationCancelled if the task was cancelled. Call at file boundaries."""
+        metrics.advance(files, nbytes)
+        task = self.current
+        if task is not None:
+            task.advance(files, nbytes)
+
+    def check_cancelled(self):
+        task = self.current
+        if task is not None and task.cancelled:
+            raise OperationCancelled(f"{task.name} was cancelled")
+
+
+# Singleton Instance (Shared by every operation in a run)
+progress = Progress()
@@ -0,0 +1,81 @@
+import re
+import time
+import fnmatch
+from datetime import date
+from functools import lru_cache
+from collections import namedtuple
+from services.services import config
+
+DAY_NS = 86400 * 10 ** 9
+
+class FileClass(namedtuple("FileClass", ["kind", "empty", "large"])):
+    """How a file is treated: kind is "image", "video", "unwanted", "keep" or "other"; empty and large are size flags."""
+    __slots__ = ()
+
+    @property
+    def is_media(self):
+        return self.kind in ("image", "video")
+
+
+class RuleSet:
+    """File classification rules compiled from the config into hashed sets and predicates.
+
+    A file is "unwanted" if its extension, its lowercase name or a glob in unwanted_patterns
+    matches and it is at least unwanted_min_age_days old; a younger match is "keep", so files
+    still being written are left alone rather than moved or organized. Otherwise a file is
+    "image" or "video" by extension, else "other". All glob patterns
+    are joined into one regex, so the cost per file does not grow with the number of rules.
+    """
+
+    def __init__(self, image_extensions, video_extensions, unwanted_extensions, unwanted_files,
+                 unwanted_patterns=(), size_threshold_mb=0, unwanted_min_age_days=0, now_ns=None):
+        self.image_extensions = frozenset(ext.lower() for ext in image_extensions or ())
+        self.video_extensions = frozenset(ext.lower() for ext in video_extensions or ())
+        self.media_extensions = self.image_extensions | self.video_extensions
+        self.unwanted_extensions = frozenset(ext.lower() for ext in unwanted_extensions or ())
+        self.unwanted_names = frozenset(name.lower() for name in unwanted_files or ())
+        patterns = [fnmatch.translate(pattern.lower()) for pattern in unwanted_patterns or ()]
+        self.unwanted_pattern = re.compile("|".join(patterns)) if patterns else None
+        self.large_bytes = (size_threshold_mb or 0) * 1024 * 1024
+        now_ns = now_ns if now_ns is not None else time.time_ns()
+        self.unwanted_cutoff_ns = now_ns - int(unwanted_min_age_days or 0) * DAY_NS if unwanted_min_age_days else None
+
+    def matches_unwanted(self, name, ext):
+        lower_name = name.lower()
+        return (ext in self.unwanted_extensions or lower_name in self.unwanted_names
+                or (self.unwanted_pattern is not None and self.unwanted_pattern.match(lower_name) is not None))
+
+    def kind_of(self, name, ext, mtime_ns=None):
+        if self.matches_unwanted(name, ext):
+            if self.unwanted_cutoff_ns is None or mtime_ns is None or mtime_ns <= self.unwanted_cutoff_ns:
+                return "unwanted"
+            return "keep"
+        if ext in self.image_extensions:
+            return "image"
+        if ext in self.video_extensions:
+            return "video"
+        return "other"
+
+    def classify(self, name, ext, size, mtime_ns):
+        """Classify a file from its directory entry; ext is the lowercase extension."""
+        return FileClass(self.kind_of(name, ext, mtime_ns), size == 0, size > self.large_bytes)
+
+
+@lru_cache(maxsize=4)
+def _compile(image_extensions, video_extensions, unwanted_extensions, unwanted_files, unwanted_patterns,
+             size_threshold_mb, unwanted_min_age_days, day):
+    return RuleSet(image_extensions, video_extensions, unwanted_extensions, unwanted_files,
+                   unwanted_patterns, size_threshold_mb, unwanted_min_age_days)
+
+def get_rules():
+    """Return the RuleSet for the current config, compiled once and reused until a setting (or the day) changes."""
+    return _compile(
+        tuple(config.get("image_extensions") or ()),
+        tuple(config.get("video_extensions") or ()),
+        tuple(config.get("unwanted_extensions") or ()),
+        tuple(config.get("unwanted_files") or ()),
+        tuple(config.get("unwanted_patterns") or ()),
+        config.get("size_threshold_mb") or 0,
+        config.get("unwanted_min_age_days") or 0,
+        date.today(),
+    )
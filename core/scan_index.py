@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from services.services import config, SingletonMeta, INDEX_FILE_PATH
+from core.metrics import metrics, timed
+
+SCHEMA_VERSION = 3
+COMMIT_EVERY = 1000
+# Cached columns besides the stat fields that validate a row
+FIELDS = ("file_hash", "hash_algorithm", "capture_date", "media_kind", "perceptual_hash")
+
+class ScanIndex(metaclass=SingletonMeta):
+    """Persistent cache of per-file scan results (hash and its algorithm, capture date, classification, perceptual hash).
+
+    Rows are keyed by path and are only trusted while the file's size, mtime and inode
+    still match the values recorded from os.stat, so a stale entry costs one stat call.
+    """
+
+    def __init__(self, db_path=INDEX_FILE_PATH):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def enabled(self):
+        return bool(config.get("use_scan_index"))
+
+    def _connect(self):
+        """Open the SQLite database on first use and (re)create the schema if needed."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                # The index is only a cache, so an old layout is simply discarded
+                self._conn.execute("DROP TABLE IF EXISTS files")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " inode INTEGER NOT NULL,"
+                " file_hash BLOB,"
+                " hash_algorithm TEXT,"
+                " capture_date TEXT,"
+                " media_kind TEXT,"
+                " perceptual_hash TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS files_size ON files (size)")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def lookup(self, path, st):
+        """Return the cached row for path as a dict, or None if it is missing or stale."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT size, mtime_ns, inode, {', '.join(FIELDS)} FROM files WHERE path = ?",
+                (self._key(path),)
+            ).fetchone()
+        if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns or row[2] != st.st_ino:
+            return None
+        return dict(zip(FIELDS, row[3:]))
+
+    def store(self, path, st, **fields):
+        """Record fields for path; cached values from a stale row are dropped."""
+        if not self.enabled:
+            return
+        values = self.lookup(path, st) or dict.fromkeys(FIELDS)
+        values.update(fields)
+        with self._lock:
+            self._connect().execute(
+                f"INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, {', '.join(FIELDS)})"
+                f" VALUES (?, ?, ?, ?{', ?' * len(FIELDS)})",
+                (self._key(path), st.st_size, st.st_mtime_ns, st.st_ino, *(values[field] for field in FIELDS))
+            )
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+
+    def paths_with_size(self, size, under=None):
+        """Indexed paths of files that had this size (optionally below the folder under); callers re-check them."""
+        if not self.enabled:
+            return []
+        with self._lock:
+            rows = self._connect().execute("SELECT path FROM files WHERE size = ?", (size,)).fetchall()
+        prefix = self._key(under) + os.sep if under else ""
+        return [path for (path,) in rows if path.startswith(prefix)]
+
+    def relocate(self, src, dest):
+        """Carry a row over to the new path after a move (rename keeps size, mtime and inode)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM files WHERE path = ?", (self._key(dest),))
+            conn.execute("UPDATE files SET path = ? WHERE path = ?", (self._key(dest), self._key(src)))
+            self._pending += 1
+
+    def commit(self):
+        """Flush pending writes to disk."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._pending = 0
+
+
+def lookup_file_hash(file_path, algorithm):
+    """Return (cached hash or None, stat result or None) for file_path.
+
+    Only a hash computed with the same algorithm is returned, so changing hash_algorithm
+    never mixes digests of different algorithms.
+    """
+    metrics.count("stats")
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None, None
+
+    row = scan_index.lookup(file_path, st)
+    if not row or row["hash_algorithm"] != algorithm:
+        return None, st
+    return row["file_hash"], st
+
+def cached_capture_date(file_path, extractor, media_kind=None):
+    """Return the metadata capture date of file_path (or None), running extractor only if the index is stale."""
+    metrics.count("stats")
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return extractor(file_path)
+
+    row = scan_index.lookup(file_path, st)
+    if row and row["capture_date"] is not None:
+        # An empty string records that the file was checked and carries no date
+        return datetime.fromisoformat(row["capture_date"]) if row["capture_date"] else None
+
+    capture_date, seconds = timed(extractor, file_path)
+    metrics.count("metadata_reads")
+    metrics.record_file(file_path, seconds)
+    fields = {"capture_date": capture_date.isoformat() if capture_date else ""}
+    if media_kind:
+        fields["media_kind"] = media_kind
+    scan_index.store(file_path, st, **fields)
+    return capture_date
+
+
+# Singleton Instance (Shared by every operation in a run)
+scan_index = ScanIndex()
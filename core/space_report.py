@@ -0,0 +1,103 @@
+import os
+import heapq
+from bisect import bisect_right
+from collections import Counter
+
+# Upper bounds of the size histogram buckets in bytes; the last bucket is open-ended
+HISTOGRAM_BOUNDS = [0, 1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2, 1024 ** 3]
+
+def format_size(nbytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if nbytes < 1024 or unit == "GB":
+            return f"{nbytes:.0f} {unit}" if unit == "B" else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+
+def histogram_label(index):
+    if index == 0:
+        return "empty"
+    if index == len(HISTOGRAM_BOUNDS):
+        return f"> {format_size(HISTOGRAM_BOUNDS[-1])}"
+    return f"{format_size(HISTOGRAM_BOUNDS[index - 1])} - {format_size(HISTOGRAM_BOUNDS[index])}"
+
+
+class SpaceReport:
+    """Where the space of a tree goes, accumulated one file at a time in a single pass.
+
+    Memory does not grow with the number of files: the largest of the files classified as large
+    live in a heap of at most `top` entries and directory totals are only kept down to `depth`
+    levels below the root (deeper files count towards their ancestor at that depth, like
+    `du --max-depth`). Extensions and kinds (image, video, unwanted, other) are counted in
+    small counters.
+    """
+
+    def __init__(self, root, top=50, depth=2):
+        self.root = os.path.normpath(root)
+        self.top = top
+        self.depth = depth
+
+        self.total_files = 0
+        self.total_bytes = 0
+        self.largest = []                   # min-heap of (size, path)
+        self.over_threshold = [0, 0]        # files, bytes of the large files
+        self.dir_bytes = Counter()
+        self.dir_files = Counter()
+        self.histogram_files = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.histogram_bytes = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.ext_files = Counter()
+        self.ext_bytes = Counter()
+        self.class_files = Counter()
+        self.class_bytes = Counter()
+
+    def add_directory(self, directory, files):
+        """Account for the FileEntry items listed directly in directory."""
+        # Every file of a directory counts towards the same ancestors, so walk them up once
+        relative = os.path.relpath(directory, self.root)
+        parts = [] if relative == "." else relative.split(os.sep)
+        ancestors = [self.root] + [os.path.join(self.root, *parts[:level]) for level in range(1, min(len(parts), self.depth) + 1)]
+        dir_bytes = 0
+
+        for entry in files:
+            size = entry.size
+            dir_bytes += size
+            self.total_files += 1
+            self.total_bytes += size
+
+            if entry.category.large:
+                self.over_threshold[0] += 1
+                self.over_threshold[1] += size
+                if len(self.largest) < self.top:
+                    heapq.heappush(self.largest, (size, entry.path))
+                elif size > self.largest[0][0]:
+                    heapq.heapreplace(self.largest, (size, entry.path))
+
+            bucket = 0 if size == 0 else bisect_right(HISTOGRAM_BOUNDS, size - 1)
+            self.histogram_files[bucket] += 1
+            self.histogram_bytes[bucket] += size
+            ext = entry.ext or "(none)"
+            self.ext_files[ext] += 1
+            self.ext_bytes[ext] += size
+            kind = entry.category.kind
+            self.class_files[kind] += 1
+            self.class_bytes[kind] += size
+
+        for ancestor in ancestors:
+            self.dir_bytes[ancestor] += dir_bytes
+            self.dir_files[ancestor] += len(files)
+
+    def result(self, max_dirs=20, max_extensions=20):
+        """The report as plain data, largest first."""
+        folders = (path for path in self.dir_bytes if path != self.root and self.dir_files[path])
+        top_dirs = heapq.nlargest(max_dirs, folders, key=self.dir_bytes.get)
+        return {
+            "root": self.root,
+            "total_files": self.total_files,
+            "total_bytes": self.total_bytes,
+            "over_threshold": {"files": self.over_threshold[0], "bytes": self.over_threshold[1]},
+            "largest_files": [{"path": path, "size": size} for size, path in sorted(self.largest, reverse=True)],
+            "directories": [{"path": path, "size": self.dir_bytes[path], "files": self.dir_files[path]} for path in top_dirs],
+            "histogram": [{"bucket": histogram_label(index), "files": self.histogram_files[index], "bytes": self.histogram_bytes[index]}
+                          for index in range(len(self.histogram_files)) if self.histogram_files[index]],
+            "extensions": [{"ext": ext, "files": self.ext_files[ext], "size": size}
+                           for ext, size in self.ext_bytes.most_common(max_extensions)],
+            "classes": {kind: {"files": self.class_files[kind], "size": self.class_bytes[kind]} for kind in sorted(self.class_files)},
+        }
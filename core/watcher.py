@@ -0,0 +1,265 @@
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from core.wrappers import operation_wrapper, with_dry_run
+from core.helpers import FileMoveError
+from core.exclusions import compile_exclusions
+from core.inventory import Inventory, FileEntry, scan_tree
+from core.rules import get_rules
+from core.progress import progress
+from core.cleaner import move_unwanted_files
+from core.media_organizer import organize_media_by_date, move_new_duplicates, index_sorted_media
+from services.services import config, logger
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+READ_SIZE = 64 * 1024
+
+class InotifyUnavailableError(Exception):
+    """Raised when inotify cannot be used (not Linux, or the watch limit is reached)."""
+    pass
+
+
+class InotifyWatcher:
+    """Reports files that were written or moved into a tree, using Linux inotify through ctypes.
+
+    Every non-excluded folder gets a watch. Files count once they are closed after writing
+    (IN_CLOSE_WRITE) or moved in (IN_MOVED_TO); new folders are watched as they appear and
+    the files already inside them are reported, so nothing copied in a burst is missed.
+    """
+
+    def __init__(self, root, excluded_folders):
+        libc_name = ctypes.util.find_library("c")
+        try:
+            self.libc = ctypes.CDLL(libc_name or "libc.so.6", use_errno=True)
+            self.libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise InotifyUnavailableError(f"inotify is not available: {e}")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise InotifyUnavailableError(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+        self.matcher = compile_exclusions(excluded_folders)
+        self.watches = {}  # watch descriptor -> folder
+        try:
+            self.add_tree(root)
+        except InotifyUnavailableError:
+            self.close()
+            raise
+
+    def add_watch(self, folder):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                raise InotifyUnavailableError("Too many folders to watch; raise fs.inotify.max_user_watches")
+            if error not in (errno.ENOENT, errno.ENOTDIR):
+                logger.warning(f"Warning: Could not watch {folder}: {os.strerror(error)}")
+            return
+        self.watches[wd] = folder
+
+    def add_tree(self, folder):
+        """Watch folder and its sub-folders; returns the files already inside them."""
+        found = []
+        if self.matcher.is_excluded(folder):
+            return found
+        for current, dirs, files in os.walk(folder):
+            dirs[:] = [d for d in dirs if not self.matcher.matches_dir(os.path.join(current, d), d)
+                       and not os.path.islink(os.path.join(current, d))]
+            self.add_watch(current)
+            found.extend(os.path.join(current, name) for name in files)
+        return found
+
+    def read_changes(self, timeout):
+        """Wait up to timeout seconds; returns (new file paths, rescan_needed)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return [], False
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return [], False
+
+        paths, rescan = [], False
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            raw_name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                rescan = True
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            folder = self.watches.get(wd)
+            if folder is None or not raw_name:
+                continue
+            path = os.path.join(folder, os.fsdecode(raw_name))
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not self.matcher.matches_dir(path):
+                    paths.extend(self.add_tree(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                paths.append(path)
+        return paths, rescan
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Fallback for systems without inotify: rescans the tree every interval.
+
+    A file is reported once its size and mtime are unchanged between two scans, so files still
+    being copied wait for the next round. Organized files leave the source folder, so a scan
+    only lists what is still waiting to be sorted (plus any folders not excluded).
+    """
+
+    def __init__(self, root, excluded_folders, interval):
+        self.root = root
+        self.excluded_folders = excluded_folders
+        self.interval = interval
+        self.seen = self._snapshot()
+        self.reported = set(self.seen)
+        self.next_scan = time.monotonic() + interval
+
+    def _snapshot(self):
+        return {entry.path: (entry.size, entry.mtime_ns)
+                for _, _, files in scan_tree(self.root, self.excluded_folders) for entry in files}
+
+    def read_changes(self, timeout):
+        wait = self.next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return [], False
+        time.sleep(max(wait, 0))
+        self.next_scan = time.monotonic() + self.interval
+
+        current = self._snapshot()
+        stable = [path for path, state in current.items()
+                  if path not in self.reported and self.seen.get(path) == state]
+        # A file that changed after it was reported is reported again once it settles
+        self.reported = {path for path in self.reported if current.get(path) == self.seen.get(path)} | set(stable)
+        self.seen = current
+        return stable, False
+
+    def close(self):
+        pass
+
+
+def open_watcher(source_dir, excluded_folders):
+    """inotify where available, otherwise periodic rescans (watch_poll_seconds)."""
+    if config.get("watch_backend") != "poll":
+        try:
+            return InotifyWatcher(source_dir, excluded_folders)
+        except InotifyUnavailableError as e:
+            logger.warning(f"Warning: {e}. Falling back to rescanning every {config.get('watch_poll_seconds')}s.")
+    return PollingWatcher(source_dir, excluded_folders, float(config.get("watch_poll_seconds") or 30))
+
+def build_batch_inventory(source_dir, paths, excluded_folders):
+    """An inventory of just the given files, classified like a full listing would."""
+    rules = get_rules()
+    matcher = compile_exclusions(excluded_folders)
+    inventory = Inventory(source_dir)
+    for path in paths:
+        if matcher.is_excluded(os.path.dirname(path)):
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue  # Gone again (temporary file, or moved by someone else)
+        if not os.path.isfile(path):
+            continue
+        name = os.path.basename(path)
+        ext = os.path.splitext(name)[1].lower()
+        inventory.files[path] = FileEntry(path, name, ext, st.st_size, st.st_mtime_ns, st.st_ino,
+                                          rules.classify(name, ext, st.st_size, st.st_mtime_ns))
+    return inventory
+
+def process_batch(source_dir, paths, dry_run, merge_media=True, dedupe=True):
+    """Move unwanted files, organize media and move duplicates for just these files."""
+    inventory = build_batch_inventory(source_dir, paths, config.get("excluded_folders"))
+    if not inventory.files:
+        return 0
+    logger.info(f"Watch: processing {len(inventory.files)} new files.")
+
+    if any(entry.category.kind == "unwanted" for entry in inventory.files.values()):
+        move_unwanted_files(dry_run=dry_run, inventory=inventory)
+
+    organized = []
+    organize_media_by_date(dry_run=dry_run, merge_media=merge_media, inventory=inventory,
+                           on_moved=lambda src, dest: organized.append(dest))
+    if organized and dedupe:
+        move_new_duplicates(dry_run=dry_run, new_files=organized)
+    return len(paths)
+
+@operation_wrapper
+@with_dry_run(default=False)
+def watch_source(source_dir, dry_run, merge_media=True, dedupe=True, initial_scan=True, max_batches=None):
+    """Keep organizing files as they arrive in the source directory, until cancelled.
+
+    New or moved-in files are collected from inotify (or periodic rescans), debounced until no
+    new file arrived for watch_debounce_seconds (or watch_batch_max files are waiting), and then
+    processed as one batch: unwanted files, organizing and (with dedupe) duplicates of the new
+    files only. Dry runs only write plans, so their new files are not checked for duplicates.
+    With initial_scan, files already waiting in the source directory form the first batch.
+    """
+    excluded_folders = config.get("excluded_folders")
+    debounce = float(config.get("watch_debounce_seconds") or 5)
+    batch_max = int(config.get("watch_batch_max") or 1000)
+    watcher = open_watcher(source_dir, excluded_folders)
+    logger.info(f"Watching {source_dir} ({type(watcher).__name__}). Cancel to stop.")
+
+    def rescan():
+        return {entry.path: time.monotonic() for _, _, files in scan_tree(source_dir, excluded_folders) for entry in files}
+
+    if dedupe and (config.get("duplicate_scope") or "month") != "month":
+        # New files are compared with what the index knows under Sorted_Media, so fill in its gaps once
+        index_sorted_media(source_dir)
+    pending = rescan() if initial_scan else {}  # path -> when it last changed
+    batches = 0
+    progress.phase("Watching")
+    try:
+        while max_batches is None or batches < max_batches:
+            progress.check_cancelled()
+            paths, rescan_needed = watcher.read_changes(timeout=min(debounce, 1.0))
+            now = time.monotonic()
+            if rescan_needed:
+                logger.warning("Warning: Too many changes at once; rescanning the source folder.")
+                pending.update(rescan())
+            for path in paths:
+                pending[path] = now
+
+            if pending and (now - max(pending.values()) >= debounce or len(pending) >= batch_max):
+                batch = list(pending)
+                pending.clear()
+                try:
+                    process_batch(source_dir, batch, dry_run, merge_media, dedupe)
+                except (OSError, FileMoveError) as e:
+                    # Already logged by the failing operation; files it did not move are retried with the next batch
+                    logger.warning(f"Warning: Watch batch stopped early: {e}")
+                    retry_at = time.monotonic()
+                    pending.update((path, retry_at) for path in batch if os.path.exists(path))
+                batches += 1
+                progress.phase("Watching")
+    finally:
+        watcher.close()
+    return batches
@@ -1,7 +1,9 @@
 from functools import wraps
-import os
 from services.services import logger, config
-from core.helpers import validate_source_dir, DirectoryNotFoundError, FileMoveError, is_excluded_path
+from core.helpers import validate_source_dir, DirectoryNotFoundError, FileMoveError
+from core.scan_index import scan_index
+from core.progress import OperationCancelled
+from core.metrics import metrics
 
 
 def get_source_dir():
@@ -21,33 +23,38 @@ def handle_errors(func_name, func):
     except DirectoryNotFoundError as e:
         logger.error(f"[{func_name}] Directory error: {e}")
         raise
-    except PermissionError:
-        logger.warning(f"Warning: Skipped (Permission Denied)")
+    except OperationCancelled:
+        logger.warning(f"[{func_name}] Cancelled by the user.")
+        raise
+    except PermissionError as e:
+        # Logged here, and re-raised so callers (pipelines, the CLI exit code) see the operation failed
+        logger.warning(f"[{func_name}] Stopped (Permission Denied): {e}")
+        raise
     except FileMoveError as e:
-        logger.warning(f"Failed to move file: {e}")
+        logger.warning(f"[{func_name}] Failed to move file: {e}")
+        raise
     except OSError as e:
-        logger.warning(f"Warning: Could not delete: {e}")
+        logger.warning(f"[{func_name}] Stopped by a file system error: {e}")
+        raise
     except Exception as e:
         logger.exception(f"[{func_name}] Unexpected error: {e}")
         raise
 
-def walk_directory(source_dir, excluded_folders, topdown=True):
-    for root, dirs, files in os.walk(source_dir, topdown=topdown):
-        if is_excluded_path(root, excluded_folders):
-            continue
-        yield root, dirs, files
-
-
 def operation_wrapper(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         func_name = func.__name__
 
         log_operation(func_name, "start")
+        metrics.start(func_name)
         def logic():
             source_dir = get_source_dir()  
             return func(source_dir, *args, **kwargs)
-        result = handle_errors(func_name, logic)
+        try:
+            result = handle_errors(func_name, logic)
+        finally:
+            scan_index.commit()
+            metrics.finish(events=logger.summary(func_name))
         log_operation(func_name, "end")
 
         return result
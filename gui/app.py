@@ -4,11 +4,18 @@ from binascii import Error as BinasciiError
 import os
 import sys
 import re
+import json
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from core import *
+from core.helpers import bytes_to_mb
+from core.progress import OperationCancelled
+from gui.task_runner import TaskRunner
 from services.services import *
 
+# Settings edited as JSON in the settings window, since their items may contain commas or brackets
+JSON_SETTINGS = ("date_filename_patterns",)
+
 class MediaOrganizerApp:
     def __init__(self, root):
         self.root = root
@@ -40,16 +47,28 @@ class MediaOrganizerApp:
             "Organize Media",
             self.organize_media,
             "Sorts images and videos into year/month folders.",
-            ["source_dir", "image_extensions", "video_extensions"],
+            ["source_dir", "image_extensions", "video_extensions", "date_sources"],
             extra_option_label="Sort All Files"
         )
         self.create_action_button(
             "Move Duplicates",
             self.move_duplicates,
             "Moves duplicate media files to a dedicated folder.",
-            ["source_dir"],
+            ["source_dir", "duplicate_scope", "hash_workers", "hash_algorithm"],
             extra_option_label="Delete Duplicates"
         )
+        self.create_action_button(
+            "Find Similar Photos",
+            self.move_near_duplicates,
+            "Moves re-saved, resized or re-compressed copies of a photo into Near_Duplicates for review.",
+            ["source_dir", "duplicate_scope", "phash_threshold"]
+        )
+        self.create_action_button(
+            "Link Duplicates",
+            self.link_duplicates,
+            "Replaces duplicate media files with hardlinks/reflinks to the kept copy. Every path keeps working.",
+            ["source_dir", "duplicate_scope", "duplicate_link_mode"]
+        )
         self.create_action_button(
             "Clean Empty Files/Folders",
             self.clean_empty,
@@ -59,29 +78,48 @@ class MediaOrganizerApp:
         self.create_action_button(
             "Find Large Files",
             self.find_large_files,
-            "Lists all files larger than the defined size threshold.",
+            "Shows the largest files over the size threshold, the biggest folders and the space used per file type.",
             ["source_dir", "size_threshold_mb"]
         )
         self.create_action_button(
             "Move unwanted files",
             self.move_unwanted_files,
             "moves all of the unwanted file extensions and specific file names",
-            ["source_dir", "unwanted_files", "unwanted_extensions"]
+            ["source_dir", "unwanted_files", "unwanted_extensions", "unwanted_patterns", "unwanted_min_age_days"]
+        )
+        self.create_action_button(
+            "Apply Last Dry Run",
+            self.apply_last_plan,
+            "Executes the plan saved by the most recent dry run of this folder, skipping files that changed since.",
+            ["source_dir"]
+        )
+        self.create_action_button(
+            "Undo Last Run",
+            self.undo_last_run,
+            "Moves the files of the most recent organize / unwanted-files run back to where they were.",
+            ["source_dir"]
         )
         self.create_action_button(
             "Encrypt Directory",
             self.encrypt_directory_handler,
-            "Encrypt all files using AES-256-CBC. You will be prompted for key and IV (hex).",
-            ["source_dir"]
+            "Encrypt all files using AES-256-CBC. You will be prompted for a key (hex) and an optional legacy IV.",
+            ["source_dir", "crypto_workers"]
         )
 
         self.create_action_button(
             "Decrypt Directory",
             self.decrypt_directory_handler,
-            "Decrypt AES-256-CBC encrypted files. You will be prompted for key and IV (hex).",
-            ["source_dir"]
+            "Decrypt AES-256-CBC encrypted files. You will be prompted for a key (hex) and an optional legacy IV.",
+            ["source_dir", "crypto_workers"]
         )
 
+        # Running tasks (progress and cancel buttons)
+        self.tasks_frame = tk.Frame(root)
+        self.tasks_frame.pack(fill=tk.X, padx=10)
+        self.task_rows = {}
+        self.task_runner = TaskRunner(root, self.show_progress, self.task_finished)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Log Output
         tk.Label(root, text="Activity Log:", font=("Arial", 10)).pack(pady=5)
         self.log_output = scrolledtext.ScrolledText(root, width=65, height=10)
@@ -127,66 +165,167 @@ class MediaOrganizerApp:
             self.folder_label.config(text=f"Current Folder: {folder}")
             self.log(f"Selected Folder: {folder}")
 
+    def run_task(self, name, func, on_success=None, read_only=False):
+        """Run a core operation on a worker thread and show its progress until it finishes."""
+        task_id = self.task_runner.submit(name, func, on_success, read_only=read_only)
+        if task_id is None:
+            messagebox.showwarning("Busy", f"{self.task_runner.running_exclusive_task()} is still running. "
+                                           "Wait for it to finish or cancel it first.")
+            return
+
+        row = tk.Frame(self.tasks_frame)
+        row.pack(fill=tk.X, pady=2)
+        label = tk.Label(row, text=f"{name}: starting...", anchor="w", font=("Arial", 9))
+        label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(row, text="Cancel", command=lambda: self.task_runner.cancel(task_id)).pack(side=tk.RIGHT)
+        self.task_rows[task_id] = (row, label)
+
+    def show_progress(self, task_id, snapshot):
+        if task_id not in self.task_rows:
+            return
+        done = snapshot["files_done"]
+        total = f"/{snapshot['files_total']}" if snapshot["files_total"] is not None else ""
+        text = f"{snapshot['task']} - {snapshot['phase']}: {done}{total} files, {snapshot['files_per_s']} files/s"
+        if snapshot["bytes_done"]:
+            text += f", {snapshot['mb_per_s']} MB/s"
+        if snapshot["eta_seconds"] is not None:
+            minutes, seconds = divmod(snapshot["eta_seconds"], 60)
+            text += f", ETA {minutes}m {seconds:02d}s"
+        self.task_rows[task_id][1].config(text=text)
+
+    def task_finished(self, task_id, name, error):
+        row = self.task_rows.pop(task_id, None)
+        if row:
+            row[0].destroy()
+        if error is None:
+            return
+        if isinstance(error, OperationCancelled):
+            self.log(f"{name} cancelled.")
+        elif isinstance(error, DirectoryNotFoundError):
+            self.log(f"Error: {error}")
+            messagebox.showerror("Error", str(error))
+        else:
+            self.log(f"Error: {error}")
+
+    def on_close(self):
+        self.task_runner.cancel_all()
+        self.root.destroy()
+
     def organize_media(self, dry_run, merge_files):
         self.log(f"Organizing media... (Dry Run: {dry_run}, Merge Images and Videos: {merge_files})")
-        try:
-            organize_media_by_date(dry_run=dry_run, merge_media=merge_files)
-            self.log("Media organized successfully!")
-        except DirectoryNotFoundError as e:
-            self.log(f"Error: {e}")
-            messagebox.showerror("Error", str(e)) 
-        except Exception as e:
-            self.log(f"Error: {e}")
+        self.run_task(
+            "Organize Media",
+            lambda: organize_media_by_date(dry_run=dry_run, merge_media=merge_files),
+            lambda plan_path: self.log(f"Plan saved to {plan_path}" if dry_run else "Media organized successfully!")
+        )
 
     def move_duplicates(self, dry_run, delete_after_move):
         self.log(f"Moving duplicates... (Dry Run: {dry_run}, Delete: {delete_after_move})")
-        try:
-            move_media_duplicates(dry_run=dry_run)
-            self.log("Duplicates moved successfully!")
 
+        def work():
+            plan_path = move_media_duplicates(dry_run=dry_run)
             if delete_after_move:
                 delete_duplicates_folders(dry_run=dry_run)
+            return plan_path
+
+        def done(plan_path):
+            self.log(f"Plan saved to {plan_path}" if dry_run else "Duplicates moved successfully!")
+            if delete_after_move:
                 self.log("Duplicates deleted successfully!")
-        except DirectoryNotFoundError as e:
-            self.log(f"Error: {e}")
-            messagebox.showerror("Error", str(e)) 
-        except Exception as e:
-            self.log(f"Error: {e}")
+
+        self.run_task("Move Duplicates", work, done)
+
+    def move_near_duplicates(self, dry_run, _):
+        self.log(f"Looking for similar photos... (Dry Run: {dry_run})")
+        self.run_task(
+            "Find Similar Photos",
+            lambda: move_near_duplicates(dry_run=dry_run),
+            lambda plan_path: self.log(f"Plan saved to {plan_path}" if dry_run else "Similar photos moved to Near_Duplicates!")
+        )
+
+    def link_duplicates(self, dry_run, _):
+        self.log(f"Linking duplicates... (Dry Run: {dry_run})")
+        self.run_task(
+            "Link Duplicates",
+            lambda: link_media_duplicates(dry_run=dry_run),
+            lambda reclaimed: self.log(f"Duplicates linked! Reclaimed {bytes_to_mb(reclaimed or 0):.2f} MB.")
+        )
 
     def clean_empty(self, dry_run, _):
         self.log(f"Cleaning empty files/folders... (Dry Run: {dry_run})")
-        try:
-            delete_empty_files(dry_run=dry_run)
-            delete_empty_folders(dry_run=dry_run)
-            self.log("Empty files and folders removed!")
-        except DirectoryNotFoundError as e:
-            self.log(f"Error: {e}")
-            messagebox.showerror("Error", str(e)) 
-        except Exception as e:
-            self.log(f"Error: {e}")
+        # One traversal shared by both operations
+        self.run_task(
+            "Clean Empty Files/Folders",
+            lambda: run_cleanup(dry_run=dry_run, operations=["delete_empty_files", "delete_empty_folders"]),
+            lambda _: self.log("Empty files and folders removed!")
+        )
 
     def find_large_files(self, dry_run, _):
         self.log(f"Searching for large files... (Dry Run: {dry_run})")
-        try:
-            find_large_files()
-            self.log("Large file search completed!")
-        except DirectoryNotFoundError as e:
-            self.log(f"Error: {e}")
-            messagebox.showerror("Error", str(e)) 
-        except Exception as e:
-            self.log(f"Error: {e}")
+        # Only reads the tree, so it may run while another operation is busy
+        self.run_task(
+            "Find Large Files",
+            lambda: find_large_files(),
+            self.show_space_report,
+            read_only=True
+        )
+
+    def show_space_report(self, report):
+        """Show the result of find_large_files in its own window."""
+        self.log("Large file search completed!")
+        if not report:
+            return
+        mb = lambda nbytes: f"{bytes_to_mb(nbytes):,.2f} MB"
+        share = lambda nbytes: f"{nbytes / report['total_bytes'] * 100:5.1f}%" if report["total_bytes"] else "  -  "
+
+        lines = [f"{report['root']}: {report['total_files']:,} files, {mb(report['total_bytes'])}",
+                 f"{report['over_threshold']['files']:,} files over {config.get('size_threshold_mb')} MB "
+                 f"({mb(report['over_threshold']['bytes'])})", "", "Largest files:"]
+        lines += [f"  {mb(item['size']):>14}  {item['path']}" for item in report["largest_files"]] or ["  (none)"]
+        lines += ["", "Largest folders:"]
+        lines += [f"  {mb(item['size']):>14} {share(item['size'])}  {item['path']} ({item['files']:,} files)"
+                  for item in report["directories"]]
+        lines += ["", "By type:"]
+        lines += [f"  {kind:<10} {mb(item['size']):>14} {share(item['size'])}  {item['files']:,} files"
+                  for kind, item in report["classes"].items()]
+        lines += ["", "By extension:"]
+        lines += [f"  {item['ext']:<10} {mb(item['size']):>14} {share(item['size'])}  {item['files']:,} files"
+                  for item in report["extensions"]]
+        lines += ["", "File sizes:"]
+        lines += [f"  {item['bucket']:<22} {item['files']:>10,} files  {mb(item['bytes']):>14}" for item in report["histogram"]]
+
+        window = tk.Toplevel(self.root)
+        window.title("Space Report")
+        window.geometry("700x500")
+        text = scrolledtext.ScrolledText(window, wrap=tk.NONE, font=("Courier", 9))
+        text.pack(fill=tk.BOTH, expand=True)
+        text.insert(tk.END, "\n".join(lines))
+        text.config(state=tk.DISABLED)
 
     def move_unwanted_files(self, dry_run, _):
         self.log(f"Moving Unwanted files...  (Dry Run: {dry_run})")
-        try:
-            move_unwanted_files(dry_run=dry_run)
-            self.log("Moving unwanted files completed!")
-        except DirectoryNotFoundError as e:
-            self.log(f"Error: {e}")
-            messagebox.showerror("Error", str(e))
-        except Exception as e:
-            self.log(f"Error: {e}")
-        
+        self.run_task(
+            "Move Unwanted Files",
+            lambda: move_unwanted_files(dry_run=dry_run),
+            lambda plan_path: self.log(f"Plan saved to {plan_path}" if dry_run else "Moving unwanted files completed!")
+        )
+
+    def apply_last_plan(self, dry_run, _):
+        self.log(f"Applying last dry run...  (Dry Run: {dry_run})")
+        self.run_task(
+            "Apply Last Dry Run",
+            lambda: apply_plan(dry_run=dry_run),
+            lambda applied: self.log("Plan applied!" if applied else "No dry run plan found for this folder.")
+        )
+
+    def undo_last_run(self, dry_run, _):
+        self.log(f"Undoing last run...  (Dry Run: {dry_run})")
+        self.run_task(
+            "Undo Last Run",
+            lambda: undo_moves(dry_run=dry_run),
+            lambda restored: self.log(f"Undo completed! Restored {restored or 0} files.")
+        )
+
     def log(self, message):
         """Log messages to the GUI output."""
         self.log_output.insert(tk.END, message + "\n")
@@ -203,7 +342,9 @@ class MediaOrganizerApp:
         config_entries = {}
         for key, value in config.config.items():
             # Ensure lists are displayed correctly
-            if isinstance(value, list):
+            if key in JSON_SETTINGS:
+                display_value = json.dumps(value)  # Regexes may contain commas, brackets and quotes
+            elif isinstance(value, list):
                 display_value = ", ".join(value)  # Convert list to clean string
             else:
                 display_value = str(value)
@@ -218,17 +359,27 @@ class MediaOrganizerApp:
             """Ensures user input is stored correctly, preventing list misformatting."""
             new_values = {}
             for key, entry in config_entries.items():
+                current_value = config.get(key)
                 try:
-                    if key == "size_threshold_mb":
+                    if isinstance(current_value, bool):
+                        new_values[key] = entry.get().strip().lower() in ["1", "true", "yes", "on"]
+                    elif key == "size_threshold_mb" or isinstance(current_value, int):
                         new_values[key] = int(entry.get())  # Ensure numeric values remain integers
-                    elif key in ["excluded_folders", "unwanted_extensions", "unwanted_files", "image_extensions", "video_extensions"]:
+                    elif key in JSON_SETTINGS:
+                        patterns = json.loads(entry.get() or "[]")
+                        if not isinstance(patterns, list) or not all(isinstance(item, str) for item in patterns):
+                            raise ValueError(f"{key} must be a JSON list of strings")
+                        for pattern in patterns:
+                            re.compile(pattern)
+                        new_values[key] = patterns
+                    elif key in ["excluded_folders", "unwanted_extensions", "unwanted_files", "unwanted_patterns", "image_extensions", "video_extensions", "date_sources"]:
                         # Remove unwanted brackets/quotes before saving
                         raw_text = entry.get()
                         cleaned_list = re.sub(r"[\[\]']", "", raw_text).split(",")  # Remove brackets & single quotes
                         new_values[key] = [item.strip() for item in cleaned_list if item.strip()]  # Ensure valid list
                     else:
                         new_values[key] = entry.get()
-                except ValueError:
+                except (ValueError, re.error):
                     messagebox.showerror("Error", f"Invalid value for {key}")
                     return
 
@@ -256,47 +407,54 @@ class MediaOrganizerApp:
         messagebox.showinfo("How to Use", help_text)
     
 
-    def encrypt_directory_handler(self, dry_run, _extra=None):
+    def ask_key_and_iv(self):
+        """Prompt for the AES key and the optional legacy IV. Returns (None, None) if the input is invalid."""
         key_hex = simpledialog.askstring("Enter AES-256 Key", "Enter 64-character hexadecimal key (256-bit):", parent=self.root)
-        iv_hex = simpledialog.askstring("Enter AES IV", "Enter 32-character hexadecimal IV (128-bit):", parent=self.root)
+        iv_hex = simpledialog.askstring(
+            "Enter AES IV",
+            "Leave empty to use per-file IVs (recommended, runs on all cores).\n"
+            "Enter a 32-character hexadecimal IV (128-bit) only for the legacy chained format:",
+            parent=self.root
+        )
 
-        if not key_hex or not iv_hex:
-            messagebox.showerror("Missing Input", "Key and IV must both be provided.")
-            return
+        if not key_hex:
+            messagebox.showerror("Missing Input", "A key must be provided.")
+            return None, None
 
         try:
             key = bytes.fromhex(key_hex)
-            iv = bytes.fromhex(iv_hex)
+            iv = bytes.fromhex(iv_hex) if iv_hex else None
         except Exception:
             messagebox.showerror("Invalid Format", "Key or IV must be valid hexadecimal.")
-            return
+            return None, None
 
-        if len(key) != 32 or len(iv) != 16:
+        if len(key) != 32 or (iv is not None and len(iv) != 16):
             messagebox.showerror("Invalid Length", "Key must be 64 hex chars, IV must be 32 hex chars.")
-            return
-
-        encrypt_directory(config.get("source_dir"), key=key, iv=iv, dry_run=dry_run)
+            return None, None
 
-    def decrypt_directory_handler(self, dry_run, _extra=None):
-        key_hex = simpledialog.askstring("Enter AES-256 Key", "Enter 64-character hexadecimal key (256-bit):", parent=self.root)
-        iv_hex = simpledialog.askstring("Enter AES IV", "Enter 32-character hexadecimal IV (128-bit):", parent=self.root)
+        return key, iv
 
-        if not key_hex or not iv_hex:
-            messagebox.showerror("Missing Input", "Key and IV must both be provided.")
+    def encrypt_directory_handler(self, dry_run, _extra=None):
+        key, iv = self.ask_key_and_iv()
+        if key is None:
             return
 
-        try:
-            key = bytes.fromhex(key_hex)
-            iv = bytes.fromhex(iv_hex)
-        except Exception:
-            messagebox.showerror("Invalid Format", "Key or IV must be valid hexadecimal.")
-            return
+        self.run_task(
+            "Encrypt Directory",
+            lambda: encrypt_directory(config.get("source_dir"), key=key, iv=iv, dry_run=dry_run),
+            lambda stats: self.log(f"Encrypted {stats['files']} files at {stats['mb_per_s']} MB/s (peak RSS: {stats['peak_rss_mb']} MB, failures: {stats['failures']})")
+        )
 
-        if len(key) != 32 or len(iv) != 16:
-            messagebox.showerror("Invalid Length", "Key must be 64 hex chars, IV must be 32 hex chars.")
+    def decrypt_directory_handler(self, dry_run, _extra=None):
+        key, iv = self.ask_key_and_iv()
+        if key is None:
             return
 
-        decrypt_directory(config.get("source_dir"), key=key, iv=iv, dry_run=dry_run)
+        self.run_task(
+            "Decrypt Directory",
+            lambda: decrypt_directory(config.get("source_dir"), key=key, iv=iv, dry_run=dry_run),
+            lambda stats: self.log(f"Decrypted {stats['files']} files at {stats['mb_per_s']} MB/s (peak RSS: {stats['peak_rss_mb']} MB, failures: {stats['failures']})")
+        )
 
 
 def check_dependencies():
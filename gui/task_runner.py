@@ -0,0 +1,80 @@
+import queue
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from core.progress import progress, TaskProgress
+
+POLL_INTERVAL_MS = 100
+
+class TaskRunner:
+    """Runs core operations on worker threads so the Tk window stays responsive.
+
+    Workers never touch Tk: progress snapshots, results and errors are put on a thread-safe
+    queue that the Tk thread drains every POLL_INTERVAL_MS. Operations that change files run
+    one at a time; read-only ones (like finding large files) may run next to anything.
+    """
+
+    def __init__(self, root, on_progress, on_finished, max_workers=4):
+        self.root = root
+        self.on_progress = on_progress    # on_progress(task_id, snapshot)
+        self.on_finished = on_finished    # on_finished(task_id, name, error or None)
+        self.events = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        self.tasks = {}  # task_id -> (TaskProgress, read_only, on_success)
+        self._ids = itertools.count(1)
+        self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def running_exclusive_task(self):
+        """Name of the running task that changes files, or None."""
+        for task, read_only, _ in self.tasks.values():
+            if not read_only:
+                return task.name
+        return None
+
+    def submit(self, name, func, on_success=None, read_only=False):
+        """Start func() on a worker; returns the task id, or None if another file-changing task is running."""
+        if not read_only and self.running_exclusive_task():
+            return None
+
+        task_id = next(self._ids)
+        task = TaskProgress(name, report=lambda snapshot: self.events.put(("progress", task_id, snapshot)))
+        self.tasks[task_id] = (task, read_only, on_success)
+        self.executor.submit(self._run, task_id, task, func)
+        return task_id
+
+    def cancel(self, task_id):
+        """Ask a task to stop at its next file boundary."""
+        if task_id in self.tasks:
+            self.tasks[task_id][0].cancel()
+
+    def cancel_all(self):
+        for task_id in list(self.tasks):
+            self.cancel(task_id)
+
+    def _run(self, task_id, task, func):
+        progress.bind(task)
+        try:
+            self.events.put(("done", task_id, func()))
+        except BaseException as e:
+            self.events.put(("error", task_id, e))
+        finally:
+            progress.unbind()
+
+    def _poll(self):
+        try:
+            while True:
+                kind, task_id, payload = self.events.get_nowait()
+                if task_id not in self.tasks:
+                    continue
+                if kind == "progress":
+                    self.on_progress(task_id, payload)
+                    continue
+
+                task, _, on_success = self.tasks.pop(task_id)
+                error = payload if kind == "error" else None
+                if error is None and on_success:
+                    on_success(payload)
+                self.on_finished(task_id, task.name, error)
+        except queue.Empty:
+            pass
+        finally:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
@@ -1,13 +1,31 @@
 import json
 import os
+import time
+import queue
+import atexit
 import logging
+import threading
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 # Paths for configuration files
 CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_CONFIG_PATH = os.path.join(CONFIG_DIR, "default_config.json")
-USER_CONFIG_PATH = os.path.join(CONFIG_DIR, "user_config.json")
+# Folder for user settings, logs, the scan index, journals and plans. PURESPACE_STATE_DIR points it
+# elsewhere, so isolated runs (benchmarks, scripts) neither read nor touch the app's own state.
+STATE_DIR = os.environ.get("PURESPACE_STATE_DIR") or CONFIG_DIR
+os.makedirs(STATE_DIR, exist_ok=True)
+USER_CONFIG_PATH = os.path.join(STATE_DIR, "user_config.json")
 # Paths for logger
-LOG_FILE_PATH = os.path.join(CONFIG_DIR, "app.log")
+LOG_FILE_PATH = os.path.join(STATE_DIR, "app.log")
+# Path for the persistent scan index (cached hashes, dates and classifications)
+INDEX_FILE_PATH = os.path.join(STATE_DIR, "scan_index.db")
+# Folder for move journals (resume and undo of organize/cleanup runs)
+JOURNAL_DIR = os.path.join(STATE_DIR, "journals")
+# Folder for the plans written by dry runs (reviewed and applied later with apply_plan)
+PLAN_DIR = os.path.join(STATE_DIR, "plans")
+# Folder for per-operation metrics reports and profiles
+METRICS_DIR = os.path.join(STATE_DIR, "metrics")
 
 # Singleton Metaclass
 class SingletonMeta(type):
@@ -19,29 +37,105 @@ class SingletonMeta(type):
             cls._instances[cls] = super(SingletonMeta, cls).__call__(*args, **kwargs)
         return cls._instances[cls]
 
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """Size-rotated log file that flushes in batches instead of after every record.
+
+    Warnings, errors and summaries are flushed right away, so they reach the disk even if the
+    process dies; a timer thread writes out anything left buffered during quiet periods.
+    """
+
+    def __init__(self, filename, max_bytes, backup_count, flush_every=200, flush_interval=1.0):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._timer = threading.Thread(target=self._flush_periodically, name="log-flush", daemon=True)
+        self._timer.start()
+
+    def emit(self, record):
+        self._force_flush = record.levelno >= logging.WARNING or getattr(record, "flush", False)
+        super().emit(record)
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            with self.lock:
+                if self._unflushed and self.stream is not None:
+                    self._force_flush = True
+                    self.flush()
+
+    def flush(self):
+        # StreamHandler.emit calls flush() after every record; only let a batch through
+        self._unflushed += 1
+        now = time.monotonic()
+        if getattr(self, "_force_flush", True) or self._unflushed >= self.flush_every or now - self._last_flush > self.flush_interval:
+            super().flush()
+            self._unflushed = 0
+            self._last_flush = now
+
+    def close(self):
+        self._stop.set()
+        self._force_flush = True
+        super().close()
+
+
 class Logger(metaclass=SingletonMeta):
-    """Centralized logger using Singleton pattern."""
-    
+    """Centralized logger using Singleton pattern.
+
+    Records are handed to a queue and written by a background thread (QueueListener) to a
+    size-rotated app.log and the console, so callers never wait on disk or terminal I/O.
+    Per-file events go through event(): they are counted per kind and only every Nth one
+    (log_event_sample) is written; summary() logs the counts. Warnings and errors are always written.
+    """
+
     def __init__(self):
         self.logger = logging.getLogger("MediaOrganizer")
+        self.listener = None
+        self._counts = threading.local()
+        self.sample_every = 1
         if not self.logger.hasHandlers():
             self.logger.setLevel(logging.DEBUG)
-            
-            # File Handler
-            file_handler = logging.FileHandler(LOG_FILE_PATH, encoding="utf-8")
-            file_handler.setLevel(logging.DEBUG)
-            file_format = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-            file_handler.setFormatter(file_format)
-
-            # Console Handler
-            console_handler = logging.StreamHandler()
-            console_handler.setLevel(logging.INFO)
-            console_format = logging.Formatter("%(levelname)s: %(message)s")
-            console_handler.setFormatter(console_format)
-
-            # Add handlers
-            self.logger.addHandler(file_handler)
-            self.logger.addHandler(console_handler)
+            self.logger.propagate = False
+            self._start(max_bytes=10 * 1024 * 1024, backup_count=3)
+
+    def _start(self, max_bytes, backup_count):
+        # File Handler
+        file_handler = BatchedRotatingFileHandler(LOG_FILE_PATH, max_bytes, backup_count)
+        file_handler.setLevel(logging.DEBUG)
+        file_format = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        file_handler.setFormatter(file_format)
+
+        # Console Handler
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_format = logging.Formatter("%(levelname)s: %(message)s")
+        console_handler.setFormatter(console_format)
+
+        # Callers only enqueue; the listener thread does the writing
+        log_queue = queue.SimpleQueue()
+        self.logger.addHandler(QueueHandler(log_queue))
+        self.listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def configure(self, settings):
+        """Apply the logging settings (rotation size, backups, event sampling) once the config is loaded."""
+        self.sample_every = int(settings.get("log_event_sample", 1) or 0)
+        if self.listener is None:
+            return
+        for handler in self.listener.handlers:
+            if isinstance(handler, RotatingFileHandler):
+                handler.maxBytes = int(float(settings.get("log_max_mb") or 10) * 1024 * 1024)
+                handler.backupCount = int(settings.get("log_backups") or 0)
+
+    def stop(self):
+        """Write out everything still queued (called automatically at exit)."""
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
 
     def info(self, message):
         self.logger.info(message)
@@ -58,6 +152,39 @@ class Logger(metaclass=SingletonMeta):
     def exception(self, message):
         self.logger.exception(message)
 
+    def _event_counts(self):
+        counts = getattr(self._counts, "value", None)
+        if counts is None:
+            counts = self._counts.value = Counter()
+        return counts
+
+    def event(self, kind, message, **fields):
+        """Log one per-file event (e.g. kind="moved"), sampled by log_event_sample.
+
+        The record carries the kind and fields as `event` and `fields` attributes for handlers
+        that want structured output. Counts are kept per thread, i.e. per running operation.
+        """
+        counts = self._event_counts()
+        counts[kind] += 1
+        if self.sample_every and (counts[kind] - 1) % self.sample_every == 0:
+            self.logger.info(message, extra={"event": kind, "fields": fields})
+
+    def summary(self, title):
+        """Log and reset the event counts of the current thread; returns them (see also last_summary)."""
+        counts = self._event_counts()
+        if counts:
+            sampled = f" (1 in {self.sample_every} logged)" if self.sample_every > 1 else ""
+            self.logger.info(f"{title}: " + ", ".join(f"{kind}={count}" for kind, count in sorted(counts.items())) + sampled,
+                             extra={"flush": True})
+        result = dict(counts)
+        counts.clear()
+        self._counts.last = result
+        return result
+
+    def last_summary(self):
+        """Event counts of the last operation that finished on the current thread."""
+        return getattr(self._counts, "last", {})
+
 
 # Config Class using Singleton Metaclass
 class Config(metaclass=SingletonMeta):
@@ -106,8 +233,18 @@ class Config(metaclass=SingletonMeta):
 
         if updated_keys:
             self._save_user_config()
+            logger.configure(self.config)
             logger.info(f"Updated settings: {updated_keys}")
 
+    def override(self, **kwargs):
+        """Change configuration values for this process only (e.g. from the command line), without saving them."""
+        valid_keys = set(self.config.keys())
+        for key, value in kwargs.items():
+            if key not in valid_keys:
+                raise KeyError(f"{key} is not a valid config key.")
+            self.config[key] = value
+        logger.configure(self.config)
+
     def show_config(self):
         """Display the current configuration settings."""
         logger.info("Current Configuration:")
@@ -117,4 +254,5 @@ class Config(metaclass=SingletonMeta):
 
 # Singleton Instance (Used across all modules)
 logger = Logger()
-config = Config()
\ No newline at end of file
+config = Config()
+logger.configure(config.config)
\ No newline at end of file